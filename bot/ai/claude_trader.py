@@ -1,7 +1,9 @@
 """Claude as the trader: analyzes market data, makes trade decisions."""
 
+import hashlib
 import json
 import logging
+import time
 from datetime import datetime
 from typing import Optional
 
@@ -25,6 +27,10 @@ HAIKU_OUTPUT_COST = 5.00  # $5/MTok
 SONNET_INPUT_COST = 3.00  # $3/MTok
 SONNET_OUTPUT_COST = 15.00  # $15/MTok
 
+# Identical prompts within this window reuse the previous decision instead of a new API call
+DECISION_CACHE_TTL = 60  # seconds
+DECISION_CACHE_MAX = 256
+
 TRADE_DECISION_SYSTEM = """You are an elite Binance Futures scalping AI running 24/7. You are aggressive and decisive.
 Your goal: maximize net PnL after ALL costs (fees, funding, slippage, API).
 
@@ -150,8 +156,9 @@ class ClaudeTrader:
     """Uses Claude to make trade decisions and perform deep analysis."""
 
     def __init__(self, db: Database):
-        self.client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
+        self.client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
         self.db = db
+        self._decision_cache: dict[bytes, tuple[float, TradeDecision]] = {}
 
     async def make_decision(
         self,
@@ -181,8 +188,19 @@ class ClaudeTrader:
             risk_pct=current_params.get("max_risk_per_trade_pct", settings.max_risk_per_trade_pct) * 100,
         )
 
+        # Key on the full prompt minus the snapshot timestamp, which differs on every call
+        cache_key = hashlib.blake2b(
+            (system + user_prompt.replace(snapshot.timestamp.isoformat(), "", 1)).encode(),
+            digest_size=16,
+        ).digest()
+        now = time.monotonic()
+        cached = self._decision_cache.get(cache_key)
+        if cached and now - cached[0] < DECISION_CACHE_TTL:
+            logger.debug("[%s] Reusing cached decision for unchanged prompt", snapshot.pair)
+            return cached[1].model_copy()
+
         try:
-            response = self.client.messages.create(
+            response = await self.client.messages.create(
                 model="claude-haiku-4-5-20251001",
                 max_tokens=450,
                 system=system,
@@ -226,6 +244,7 @@ class ClaudeTrader:
                 f"[{snapshot.pair}] Claude: {decision.action.value} "
                 f"conf={decision.confidence:.2f} - {decision.reasoning[:80]}"
             )
+            self._cache_decision(cache_key, now, decision)
             return decision
 
         except json.JSONDecodeError as e:
@@ -235,6 +254,13 @@ class ClaudeTrader:
             logger.error(f"Claude API error: {e}")
             return TradeDecision(action=ActionType.HOLD, pair=snapshot.pair, reasoning=f"API error: {e}")
 
+    def _cache_decision(self, key: bytes, now: float, decision: TradeDecision):
+        if len(self._decision_cache) >= DECISION_CACHE_MAX:
+            self._decision_cache = {
+                k: v for k, v in self._decision_cache.items() if now - v[0] < DECISION_CACHE_TTL
+            }
+        self._decision_cache[key] = (now, decision)
+
     async def deep_analysis(
         self,
         recent_trades: list[dict],
@@ -267,7 +293,7 @@ Analyze deeply:
 """
 
         try:
-            response = self.client.messages.create(
+            response = await self.client.messages.create(
                 model="claude-sonnet-4-6",
                 max_tokens=4000,
                 system=DEEP_ANALYSIS_SYSTEM,
@@ -312,7 +338,7 @@ Analyze deeply:
     ) -> str:
         """Build compact but comprehensive prompt for trade decision."""
         # Only include non-None fields, exclude noisy ones
-        snap_dict = snapshot.model_dump(exclude_none=True)
+        snap_dict = snapshot.to_dict()
         snap_dict["timestamp"] = snap_dict["timestamp"].isoformat()
         # Remove fields that Claude doesn't need raw (ema_alignment covers these)
         for key in ("ema_9", "ema_21", "ema_50", "bb_upper", "bb_lower"):
@@ -5,12 +5,28 @@ import logging
 from datetime import datetime
 from typing import Optional
 
+import orjson
+
 from core.models import Trade, TradeMemory, MarketRegime
 from db.database import Database
 
 logger = logging.getLogger(__name__)
 
 
+def _decode_memory(m: dict):
+    """Parse the JSON text columns of a trade_memory row in place."""
+    if isinstance(m.get("indicators_at_entry"), str):
+        try:
+            m["indicators_at_entry"] = json.loads(m["indicators_at_entry"])
+        except json.JSONDecodeError:
+            m["indicators_at_entry"] = {}
+    if isinstance(m.get("tags"), str):
+        try:
+            m["tags"] = json.loads(m["tags"])
+        except json.JSONDecodeError:
+            m["tags"] = []
+
+
 class MemorySystem:
     """Records every trade with context, finds similar past trades, and stores lessons."""
 
@@ -25,7 +41,31 @@ class MemorySystem:
         sentiment_score: Optional[int] = None,
     ):
         """Record a closed trade in memory for future learning."""
-        memory = {
+        memory = self._memory_row(trade, indicators, market_regime, sentiment_score)
+        await self.db.insert_memory(memory)
+        logger.info(f"Recorded trade memory: {trade.pair} {trade.direction.value} PnL={trade.pnl:.4f}")
+
+        # Update rule statistics based on this trade outcome
+        await self._update_rule_stats_from_trade(trade)
+
+    async def record_trades(self, records: list[tuple[Trade, dict, MarketRegime]]):
+        """record_trade for several closed trades, with a single insert for the memory rows."""
+        await self.db.insert_memories([
+            self._memory_row(trade, indicators, regime) for trade, indicators, regime in records
+        ])
+        logger.info(f"Recorded {len(records)} trade memories")
+        async with self.db.transaction():
+            for trade, _, _ in records:
+                await self._update_rule_stats_from_trade(trade)
+
+    @staticmethod
+    def _memory_row(
+        trade: Trade,
+        indicators: dict,
+        market_regime: MarketRegime,
+        sentiment_score: Optional[int] = None,
+    ) -> dict:
+        return {
             "trade_id": trade.id,
             "pair": trade.pair,
             "direction": trade.direction.value,
@@ -34,7 +74,7 @@ class MemorySystem:
             "leverage": trade.leverage,
             "hold_time_minutes": trade.hold_time_minutes,
             "market_regime": market_regime.value,
-            "indicators_at_entry": json.dumps(indicators),
+            "indicators_at_entry": orjson.dumps(indicators, option=orjson.OPT_NON_STR_KEYS).decode(),
             "sentiment_score": sentiment_score,
             "claude_reasoning": trade.entry_reasoning,
             "lesson_learned": "",
@@ -42,25 +82,21 @@ class MemorySystem:
             "created_at": datetime.utcnow().isoformat(),
         }
 
-        await self.db.insert_memory(memory)
-        logger.info(f"Recorded trade memory: {trade.pair} {trade.direction.value} PnL={trade.pnl:.4f}")
-
-        # Update rule statistics based on this trade outcome
-        await self._update_rule_stats_from_trade(trade)
-
     async def _update_rule_stats_from_trade(self, trade: Trade):
         """After a trade closes, update stats for any rules that match."""
-        rules = await self.db.get_active_rules()
+        rules = await self.get_active_rules()
         profitable = trade.pnl > 0
+        now = datetime.utcnow().isoformat()
 
-        for rule in rules:
-            # Simple keyword matching to see if rule was relevant
-            rule_text = rule["rule"].lower()
-            pair_relevant = trade.pair.lower() in rule_text or "all" in rule_text
-            direction_match = trade.direction.value.lower() in rule_text
+        async with self.db.transaction():
+            for rule in rules:
+                # Simple keyword matching to see if rule was relevant
+                rule_text = rule["rule"].lower()
+                pair_relevant = trade.pair.lower() in rule_text or "all" in rule_text
+                direction_match = trade.direction.value.lower() in rule_text
 
-            if pair_relevant or direction_match:
-                await self.db.update_rule_stats(rule["id"], successful=profitable)
+                if pair_relevant or direction_match:
+                    await self.db.update_rule_stats(rule["id"], successful=profitable, now=now)
 
     async def find_similar(
         self,
@@ -71,40 +107,47 @@ class MemorySystem:
         """Find similar past trades (pair + regime) for Claude's prompt."""
         memories = await self.db.find_similar_trades(pair, market_regime, limit)
         for m in memories:
-            if isinstance(m.get("indicators_at_entry"), str):
-                try:
-                    m["indicators_at_entry"] = json.loads(m["indicators_at_entry"])
-                except json.JSONDecodeError:
-                    m["indicators_at_entry"] = {}
-            if isinstance(m.get("tags"), str):
-                try:
-                    m["tags"] = json.loads(m["tags"])
-                except json.JSONDecodeError:
-                    m["tags"] = []
+            _decode_memory(m)
         return memories
 
+    async def find_similar_batch(
+        self,
+        pairs: list[str],
+        market_regime: str = "unknown",
+        limit: int = 5,
+    ) -> dict[str, list[dict]]:
+        """find_similar for every pair in one DB query (used once per analysis cycle)."""
+        by_pair = await self.db.find_similar_trades_batch(pairs, market_regime, limit)
+        for memories in by_pair.values():
+            for m in memories:
+                _decode_memory(m)
+        return by_pair
+
     async def get_pattern_stats(self, pair: str, direction: str, market_regime: str) -> dict:
         """Get win-rate statistics for a specific pattern (pair + direction + regime)."""
-        all_memories = await self.db.get_recent_memories(limit=500)
+        all_memories = await self.db.get_recent_memories(
+            limit=500, columns=("pair", "direction", "market_regime", "pnl", "pnl_pct", "hold_time_minutes"),
+            as_dicts=False,
+        )
         matching = [
             m for m in all_memories
-            if (m.get("pair") == pair or pair == "")
-            and (m.get("direction") == direction or direction == "")
-            and (m.get("market_regime") == market_regime or market_regime == "")
+            if (m["pair"] == pair or pair == "")
+            and (m["direction"] == direction or direction == "")
+            and (m["market_regime"] == market_regime or market_regime == "")
         ]
         total = len(matching)
         if total == 0:
             return {"total": 0, "wins": 0, "win_rate": 0, "avg_pnl_pct": 0, "summary": "No historical data"}
 
-        wins = sum(1 for m in matching if m.get("pnl", 0) > 0)
-        avg_pnl = sum(m.get("pnl_pct", 0) for m in matching) / total
-        avg_hold = sum(m.get("hold_time_minutes", 0) for m in matching) / total
-        best = max(m.get("pnl_pct", 0) for m in matching)
-        worst = min(m.get("pnl_pct", 0) for m in matching)
+        wins = sum(1 for m in matching if m["pnl"] > 0)
+        avg_pnl = sum(m["pnl_pct"] for m in matching) / total
+        avg_hold = sum(m["hold_time_minutes"] for m in matching) / total
+        best = max(m["pnl_pct"] for m in matching)
+        worst = min(m["pnl_pct"] for m in matching)
 
         # Recent trend (last 10 trades)
         recent = matching[:10]
-        recent_wins = sum(1 for m in recent if m.get("pnl", 0) > 0) if recent else 0
+        recent_wins = sum(1 for m in recent if m["pnl"] > 0) if recent else 0
         recent_str = f", recent {recent_wins}/{len(recent)}" if len(recent) >= 3 else ""
 
         summary = (
@@ -137,12 +180,10 @@ class MemorySystem:
                 continue
 
             # Find the memory entry for this trade
-            memories = await self.db.find_similar_trades(pair="", market_regime="", limit=200)
-            for mem in memories:
-                if mem.get("trade_id") == trade_id:
-                    await self.db.update_memory_lesson(mem["id"], lesson, tags)
-                    logger.info(f"Updated lesson for trade {trade_id}: {lesson[:60]}")
-                    break
+            mem = await self.db.get_memory_by_trade_id(trade_id)
+            if mem:
+                await self.db.update_memory_lesson(mem["id"], lesson, tags)
+                logger.info(f"Updated lesson for trade {trade_id}: {lesson[:60]}")
 
     async def add_rule(self, rule: str, source_trades: list[str], confidence: float = 0.5):
         """Add a new learned rule."""
@@ -166,33 +207,24 @@ class MemorySystem:
             logger.info(f"Deactivated {deactivated} poor-performing rules")
 
     async def get_active_rules(self) -> list[dict]:
-        """Get all active learned rules."""
+        """Get all active learned rules (cached in the DB layer until a rule changes)."""
         return await self.db.get_active_rules()
 
     async def get_recent_memories(self, limit: int = 20) -> list[dict]:
         """Get recent trade memories with lessons."""
         memories = await self.db.get_recent_memories(limit)
         for m in memories:
-            if isinstance(m.get("indicators_at_entry"), str):
-                try:
-                    m["indicators_at_entry"] = json.loads(m["indicators_at_entry"])
-                except json.JSONDecodeError:
-                    m["indicators_at_entry"] = {}
-            if isinstance(m.get("tags"), str):
-                try:
-                    m["tags"] = json.loads(m["tags"])
-                except json.JSONDecodeError:
-                    m["tags"] = []
+            _decode_memory(m)
         return memories
 
     async def get_stats(self) -> dict:
         """Get memory system stats."""
-        memories = await self.db.get_recent_memories(limit=1000)
-        rules = await self.db.get_active_rules()
+        memories = await self.db.get_recent_memories(limit=1000, columns=("pnl", "lesson_learned"), as_dicts=False)
+        rules = await self.get_active_rules()
 
         total = len(memories)
-        with_lessons = sum(1 for m in memories if m.get("lesson_learned"))
-        winning = sum(1 for m in memories if m.get("pnl", 0) > 0)
+        with_lessons = sum(1 for m in memories if m["lesson_learned"])
+        winning = sum(1 for m in memories if m["pnl"] > 0)
 
         return {
             "total_memories": total,
@@ -68,9 +68,10 @@ class Optimizer:
             "max_open_positions": settings.max_open_positions,
             "min_score_to_enter": settings.min_score_to_enter,
         }
-        for name, value in defaults.items():
-            if name not in current:
-                await self.db.set_current_param(name, value)
+        async with self.db.transaction():
+            for name, value in defaults.items():
+                if name not in current:
+                    await self.db.set_current_param(name, value)
 
     async def should_run(self) -> bool:
         """Check if enough time has passed since last optimization."""
@@ -166,15 +167,16 @@ Suggest parameter changes (max 20% change per parameter per cycle).
                     new_val = round(new_val, 4)
 
                 # Apply
-                await self.db.set_current_param(name, new_val)
-                await self.db.insert_param_change({
-                    "param_name": name,
-                    "old_value": current_val,
-                    "new_value": new_val,
-                    "reasoning": change.get("reasoning", ""),
-                    "performance_before": json.dumps(performance),
-                    "created_at": datetime.utcnow().isoformat(),
-                })
+                async with self.db.transaction():
+                    await self.db.set_current_param(name, new_val)
+                    await self.db.insert_param_change({
+                        "param_name": name,
+                        "old_value": current_val,
+                        "new_value": new_val,
+                        "reasoning": change.get("reasoning", ""),
+                        "performance_before": json.dumps(performance),
+                        "created_at": datetime.utcnow().isoformat(),
+                    })
 
                 applied.append({
                     "param": name,
@@ -198,13 +200,14 @@ Suggest parameter changes (max 20% change per parameter per cycle).
             if not change.get("reverted"):
                 name = change["param_name"]
                 old_val = change["old_value"]
-                await self.db.set_current_param(name, old_val)
-                await self.db.insert_param_change({
-                    "param_name": name,
-                    "old_value": change["new_value"],
-                    "new_value": old_val,
-                    "reasoning": "Reverted: performance worsened after change",
-                    "reverted": 1,
-                    "created_at": datetime.utcnow().isoformat(),
-                })
+                async with self.db.transaction():
+                    await self.db.set_current_param(name, old_val)
+                    await self.db.insert_param_change({
+                        "param_name": name,
+                        "old_value": change["new_value"],
+                        "new_value": old_val,
+                        "reasoning": "Reverted: performance worsened after change",
+                        "reverted": 1,
+                        "created_at": datetime.utcnow().isoformat(),
+                    })
                 logger.info(f"Reverted {name} back to {old_val}")
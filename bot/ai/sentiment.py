@@ -18,6 +18,8 @@ FEAR_GREED_URL = "https://api.alternative.me/fng/"
 CRYPTOPANIC_MONTHLY_LIMIT = 3000
 CRYPTOPANIC_DAILY_SAFE_LIMIT = 90  # 3000/month ÷ 33 days buffer
 
+_EMPTY: dict = {}  # shared read-only default for missing votes/metadata
+
 
 class SentimentAnalyzer:
     """Fetches and scores news sentiment from CryptoPanic + Fear & Greed Index."""
@@ -85,12 +87,9 @@ class SentimentAnalyzer:
             self._last_news = results[:10]
 
             # Score based on votes
-            positive = sum(
-                r.get("votes", {}).get("positive", 0) for r in results[:10]
-            )
-            negative = sum(
-                r.get("votes", {}).get("negative", 0) for r in results[:10]
-            )
+            votes = [r.get("votes") or _EMPTY for r in self._last_news]
+            positive = sum(v.get("positive", 0) for v in votes)
+            negative = sum(v.get("negative", 0) for v in votes)
             total = positive + negative
             if total > 0:
                 self._sentiment_score = int((positive / total) * 100)
@@ -100,7 +99,7 @@ class SentimentAnalyzer:
             # Check for breaking/rising news
             self._breaking_news = [
                 r for r in results[:5]
-                if r.get("metadata", {}).get("is_rising")
+                if (r.get("metadata") or _EMPTY).get("is_rising")
             ]
 
             self._last_fetch = datetime.utcnow()
@@ -116,7 +115,7 @@ class SentimentAnalyzer:
             })
 
             latest_title = results[0]["title"] if results else "No recent news"
-            logger.info(f"Sentiment score: {self._sentiment_score}/100, latest: {latest_title[:60]}")
+            logger.info("Sentiment score: %d/100, latest: %.60s", self._sentiment_score, latest_title)
 
             return {
                 "score": self._sentiment_score,
@@ -142,7 +141,7 @@ class SentimentAnalyzer:
 
             value = int(data["data"][0]["value"])
             self._fear_greed = value
-            logger.info(f"Fear & Greed Index: {value}")
+            logger.info("Fear & Greed Index: %d", value)
             return value
 
         except Exception as e:
@@ -1,10 +1,14 @@
 """FastAPI server exposing bot data to the dashboard."""
 
 import logging
+from operator import itemgetter
 from typing import Optional
 
+import numpy as np
+import orjson
 from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 
 from config.settings import settings
 
@@ -22,6 +26,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+_pnl = itemgetter("pnl")
+
 # Engine reference (set by main.py)
 _engine = None
 
@@ -49,16 +55,32 @@ async def get_status():
 async def get_trades(
     pair: Optional[str] = None,
     status: Optional[str] = None,
-    limit: int = Query(default=50, le=500),
+    limit: int = Query(default=50, ge=1, le=500),
     offset: int = Query(default=0, ge=0),
 ):
     """Trade history with pagination and filters."""
     engine = get_engine()
     trades = await engine.db.get_trades(pair=pair, status=status, limit=limit, offset=offset)
-    total = await engine.db.count_trades(status=status)
+    total = await engine.db.count_trades(pair=pair, status=status)
     return {"trades": trades, "total": total, "limit": limit, "offset": offset}
 
 
+@app.get("/api/trades.ndjson")
+async def stream_trades(
+    pair: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(default=1000, ge=1, le=50000),
+    offset: int = Query(default=0, ge=0),
+):
+    """Trade history as newline-delimited JSON, streamed row by row for large downloads."""
+    engine = get_engine()
+    rows = engine.db.iter_trades(pair=pair, status=status, limit=limit, offset=offset)
+    return StreamingResponse(
+        (orjson.dumps(r) + b"\n" async for r in rows),
+        media_type="application/x-ndjson",
+    )
+
+
 @app.get("/api/trades/{trade_id}")
 async def get_trade_detail(trade_id: str):
     """Single trade with full reasoning and indicators."""
@@ -68,14 +90,13 @@ async def get_trade_detail(trade_id: str):
         return {"error": "Trade not found"}, 404
 
     # Get associated memory
-    memories = await engine.db.find_similar_trades(trade["pair"], "", limit=100)
-    memory = next((m for m in memories if m.get("trade_id") == trade_id), None)
+    memory = await engine.db.get_memory_by_trade_id(trade_id)
 
     return {"trade": trade, "memory": memory}
 
 
 @app.get("/api/memory")
-async def get_memory(limit: int = Query(default=50, le=200)):
+async def get_memory(limit: int = Query(default=50, ge=1, le=200)):
     """Lessons learned and patterns."""
     engine = get_engine()
     memories = await engine.memory.get_recent_memories(limit)
@@ -89,18 +110,23 @@ async def get_analytics():
     """Calculated metrics: Sharpe, drawdown, win rate, per pair."""
     engine = get_engine()
     daily_stats = await engine.db.get_daily_stats(limit=30)
-    all_trades = await engine.db.get_trades(status="closed", limit=1000)
+    all_trades = await engine.db.get_trades(
+        status="closed", limit=1000, columns=("pair", "pnl", "pnl_pct", "closed_at"), as_dicts=False
+    )
 
     # Compute analytics
     total_trades = len(all_trades)
-    winning = [t for t in all_trades if t["pnl"] > 0]
-    losing = [t for t in all_trades if t["pnl"] <= 0]
+    pnls = list(map(_pnl, all_trades))
+    winning = [p for p in pnls if p > 0]
+    losing = [p for p in pnls if p <= 0]
     win_rate = len(winning) / total_trades if total_trades > 0 else 0
 
-    total_pnl = sum(t["pnl"] for t in all_trades)
-    avg_win = sum(t["pnl"] for t in winning) / len(winning) if winning else 0
-    avg_loss = sum(t["pnl"] for t in losing) / len(losing) if losing else 0
-    profit_factor = abs(sum(t["pnl"] for t in winning) / sum(t["pnl"] for t in losing)) if losing and sum(t["pnl"] for t in losing) != 0 else 0
+    total_pnl = sum(pnls)
+    gross_win = sum(winning)
+    gross_loss = sum(losing)
+    avg_win = gross_win / len(winning) if winning else 0
+    avg_loss = gross_loss / len(losing) if losing else 0
+    profit_factor = abs(gross_win / gross_loss) if gross_loss != 0 else 0
 
     # PnL by pair
     pnl_by_pair = {}
@@ -116,19 +142,22 @@ async def get_analytics():
     # PnL by hour
     pnl_by_hour = {}
     for t in all_trades:
-        if t.get("closed_at"):
+        if t["closed_at"]:
             hour = t["closed_at"][11:13] if isinstance(t["closed_at"], str) else "00"
             if hour not in pnl_by_hour:
                 pnl_by_hour[hour] = 0
             pnl_by_hour[hour] += t["pnl"]
 
-    # Sharpe ratio approximation
-    import numpy as np
+    # Sharpe ratio approximation (single pass: sum + sum of squares)
+    sharpe = 0
     if all_trades:
-        returns = [t["pnl_pct"] for t in all_trades]
-        sharpe = (np.mean(returns) / np.std(returns)) * np.sqrt(252) if np.std(returns) > 0 else 0
-    else:
-        sharpe = 0
+        returns = np.fromiter((t["pnl_pct"] for t in all_trades), dtype=np.float64, count=total_trades)
+        mean_sq = (returns @ returns) / total_trades
+        mean = returns.sum() / total_trades
+        var = mean_sq - mean * mean
+        # E[x²]-E[x]² can cancel to float noise when all returns are equal
+        if var > mean_sq * 1e-12:
+            sharpe = float(mean / np.sqrt(var) * np.sqrt(252))
 
     # Max drawdown from daily stats
     max_dd = min((s.get("max_drawdown_pct", 0) for s in daily_stats), default=0)
@@ -194,7 +223,7 @@ async def get_market():
 
     snapshot_dicts = {}
     for pair, snap in snapshots.items():
-        d = snap.model_dump(exclude_none=True)
+        d = snap.to_dict()
         d["timestamp"] = d["timestamp"].isoformat()
         snapshot_dicts[pair] = d
 
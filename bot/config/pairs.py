@@ -31,7 +31,7 @@ async def get_top_pairs(count: int = 20) -> list[str]:
         usdt_pairs.sort(key=lambda t: float(t["quoteVolume"]), reverse=True)
         top = [t["symbol"] for t in usdt_pairs[:count]]
 
-        logger.info(f"Top {count} pairs by volume: {top}")
+        logger.info("Top %d pairs by volume: %s", count, top)
         client.close_connection()
         return top
     except Exception as e:
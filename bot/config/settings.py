@@ -51,6 +51,7 @@ class Settings(BaseSettings):
 
     # Timeframes
     analysis_interval_seconds: int = 45    # balanced: fast enough to catch moves, slow enough to save API costs
+    max_concurrent_analyses: int = 4       # pairs analyzed (Claude calls in flight) at once
     optimization_interval_hours: int = 4   # optimize more frequently
     deep_analysis_interval_hours: int = 2  # learn faster
     sentiment_poll_minutes: int = 15
@@ -70,4 +71,4 @@ class Settings(BaseSettings):
 settings = Settings()
 
 # Major pairs get lower slippage
-MAJOR_PAIRS = {"BTCUSDT", "ETHUSDT"}
+MAJOR_PAIRS = frozenset({"BTCUSDT", "ETHUSDT"})
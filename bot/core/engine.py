@@ -1,18 +1,25 @@
 """Main engine: orchestrates the trading loop, connects all components."""
 
 import asyncio
+import heapq
 import logging
+import random
+import sqlite3
 import time
 from datetime import datetime
 from typing import Optional
 
+import httpx
+import numpy as np
+import orjson
+
 from config.settings import settings
 from config.pairs import get_top_pairs
 from core.events import EventBus, EventType, Event
-from core.models import ActionType, MarketRegime, MarketSnapshot
+from core.models import ActionType, MarketRegime, MarketSnapshot, Trade
 from data.candles import CandleStore
 from data.orderbook import OrderBookStore
-from data.stream_manager import StreamManager
+from data.stream_manager import StreamManager, STREAM_KLINE, STREAM_BOOK_TICKER
 from data.futures_data import FuturesDataFetcher
 from data.history_loader import load_historical_candles
 from db.database import Database
@@ -28,10 +35,38 @@ from risk.circuit_breaker import CircuitBreaker
 
 logger = logging.getLogger(__name__)
 
+TRADE_WRITE_BATCH = 64  # max closed trades per memory insert
+
+# Expected I/O failures (network, timeouts, locked DB): logged as warnings, no traceback
+TRANSIENT_ERRORS = (OSError, sqlite3.OperationalError, httpx.HTTPError)
+TRACEBACK_SAMPLE = 100  # full traceback for 1 in N unexpected errors
+PAIR_COOLDOWN_SECONDS = 180  # no re-entry on a pair this soon after closing it
+TRAIL_UPDATE_INTERVAL = 0.2  # seconds between book-ticker trailing-stop recomputes per pair
+CANDLE_SETTLE_SECONDS = 2  # after the first 1m close, let the other pairs' closes land
+DB_RETRY_BASE_SECONDS = 1  # first backoff after a failed trade write batch
+DB_RETRY_MAX_SECONDS = 30
+
 
 class TradingEngine:
     """Main engine that connects all components and runs the trading loop."""
 
+    # Fixed attribute set: WS callbacks read these on every frame
+    __slots__ = (
+        "db", "event_bus",
+        "candle_store", "orderbook_store", "stream_manager", "futures_data",
+        "market_analyzer",
+        "claude_trader", "memory", "optimizer", "sentiment",
+        "paper_trader", "position_manager",
+        "risk_manager", "circuit_breaker",
+        "pairs", "_running", "_started_at", "_started_at_mono", "_analysis_count",
+        "_last_deep_analysis", "_last_optimization",
+        "_current_regime", "_regime_consensus", "_regime_epoch",
+        "_cooldown_until", "_cooldown_heap", "_market_context", "_analysis_sem",
+        "_closing", "_bg_tasks", "_last_day_utc",
+        "_trade_write_q", "_trade_writer_task", "_db_writer_task", "_error_count", "_funding_fraction",
+        "_last_trail_update", "_new_candle_event", "_last_candle_close",
+    )
+
     def __init__(self):
         # Core
         self.db = Database()
@@ -64,12 +99,31 @@ class TradingEngine:
         self.pairs: list[str] = []
         self._running = False
         self._started_at: Optional[datetime] = None
+        self._started_at_mono = 0.0
         self._analysis_count = 0
-        self._last_deep_analysis: Optional[datetime] = None
-        self._last_optimization: Optional[datetime] = None
+        self._last_deep_analysis: Optional[float] = None  # epoch seconds
+        self._last_optimization: Optional[float] = None  # epoch seconds
         self._current_regime = MarketRegime.UNKNOWN
-        self._pair_cooldown: dict[str, datetime] = {}  # pair -> last close time
+        self._regime_consensus = MarketRegime.UNKNOWN  # last fast consensus
+        self._regime_epoch = -1  # candle_store.mutation_epoch it was computed at
+        # Cooling-down pairs -> expiry (monotonic); heap of (expiry, pair) purges them lazily
+        self._cooldown_until: dict[str, float] = {}
+        self._cooldown_heap: list[tuple[float, str]] = []
         self._market_context: dict = {}  # cached market summary for prompt
+        self._analysis_sem = asyncio.Semaphore(settings.max_concurrent_analyses)
+        self._closing: set[str] = set()  # pairs with a triggered close in flight
+        self._bg_tasks: set[asyncio.Task] = set()
+        self._last_day_utc = -1  # UTC day number of the last new-day check
+        # Closed trades for the memory writer; stop() queues None to end it
+        self._trade_write_q: asyncio.Queue[Optional[tuple[Trade, dict, MarketRegime]]] = asyncio.Queue()
+        self._trade_writer_task: Optional[asyncio.Task] = None
+        self._db_writer_task: Optional[asyncio.Task] = None  # cancelled by stop() before its final flush
+        self._error_count = 0  # unexpected loop errors, for traceback sampling
+        # Share of the 8h funding rate charged per check interval (30/480 = 6.25%)
+        self._funding_fraction = settings.funding_rate_check_minutes / (8 * 60)
+        self._last_trail_update: dict[str, float] = {}  # pair -> monotonic time
+        self._new_candle_event = asyncio.Event()  # set when any 1m candle closes
+        self._last_candle_close = 0.0  # monotonic time the event was last set
 
     async def start(self):
         """Initialize all components and start the trading loop."""
@@ -77,6 +131,11 @@ class TradingEngine:
         logger.info("TRADING ENGINE STARTING - SKYNET MODE")
         logger.info("=" * 60)
 
+        # The loop is chosen in main.py (uvloop.run); a policy set here would be too late
+        loop_impl = type(asyncio.get_running_loop()).__module__
+        if not loop_impl.startswith("uvloop"):
+            logger.warning(f"Running on {loop_impl} event loop; install uvloop for faster WS callback dispatch")
+
         # Connect DB
         await self.db.connect()
 
@@ -125,32 +184,52 @@ class TradingEngine:
         # Start WebSocket streams (includes markPrice for funding rates)
         self.stream_manager = StreamManager(
             pairs=self.pairs,
-            on_kline=self._on_kline,
-            on_book_ticker=self._on_book_ticker,
-            on_agg_trade=self._on_agg_trade,
-            on_mark_price=self._on_mark_price,
+            on_message=self._on_stream_message,
         )
         await self.stream_manager.start()
 
         self._running = True
         self._started_at = datetime.utcnow()
+        self._started_at_mono = time.monotonic()
 
         logger.info(
             f"Engine started. Balance: ${self.paper_trader.balance:.2f}, "
             f"Pairs: {len(self.pairs)}, Mode: {'PAPER' if settings.paper_trading else 'LIVE'}"
         )
 
-        # Run main loops concurrently
-        await asyncio.gather(
-            self._analysis_loop(),
-            self._sentiment_loop(),
-            self._deep_analysis_loop(),
-            self._optimization_loop(),
-            self._daily_stats_loop(),
-            self._health_check_loop(),
-            self._futures_data_loop(),
-            self._funding_rate_loop(),
-        )
+        # Run main loops concurrently; each is supervised so one crash can't stop the others
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(self._supervise(self._analysis_loop, "analysis"))
+            tg.create_task(self._supervise(self._sentiment_loop, "sentiment"))
+            tg.create_task(self._supervise(self._deep_analysis_loop, "deep_analysis"))
+            tg.create_task(self._supervise(self._scheduler_loop, "scheduler"))
+            tg.create_task(self._supervise(self._futures_data_loop, "futures_data"))
+            tg.create_task(self._supervise(self._funding_rate_loop, "funding_rate"))
+            self._db_writer_task = tg.create_task(self._supervise(self._db_writer_loop, "db_writer"))
+            self._trade_writer_task = tg.create_task(self._supervise(self._trade_writer_loop, "trade_writer"))
+
+    async def _supervise(self, loop_factory, name: str):
+        """Run a main loop, restarting it with backoff if it dies with an exception."""
+        backoff = 1
+        while self._running:
+            try:
+                await loop_factory()
+                return  # loop exited normally (engine stopping)
+            except Exception:
+                logger.exception(f"{name} loop crashed, restarting in {backoff}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+
+    def _log_error(self, msg: str, e: Exception):
+        """Log a caught loop error; tracebacks only for unexpected errors, sampled under error storms."""
+        if isinstance(e, TRANSIENT_ERRORS):
+            logger.warning(f"{msg}: {e}")
+            return
+        self._error_count += 1
+        if self._error_count % TRACEBACK_SAMPLE == 1:
+            logger.error(f"{msg}: {e}", exc_info=e)
+        else:
+            logger.error(f"{msg}: {e} (traceback suppressed, {self._error_count} unexpected errors)")
 
     async def stop(self):
         """Gracefully shut down the engine."""
@@ -158,6 +237,26 @@ class TradingEngine:
         self._running = False
         if self.stream_manager:
             await self.stream_manager.stop()
+        # The memory writer records everything queued ahead of the sentinel, then exits
+        self._trade_write_q.put_nowait(None)
+        if self._trade_writer_task is not None:
+            await asyncio.wait({self._trade_writer_task})
+        # Left over only if the writer never ran (or died): record them here
+        closed = [t for t in self._take_trade_writes(self._trade_write_q.qsize()) if t is not None]
+        try:
+            if closed:
+                await self.memory.record_trades(closed)
+        except Exception as e:
+            logger.warning(f"Could not flush {len(closed)} queued trade memories: {e}")
+        # Stop the DB writer first, so this flush is the only thing draining the queue: a batch
+        # it was cancelled in the middle of is kept by the db and written here, ahead of the rest
+        if self._db_writer_task is not None:
+            self._db_writer_task.cancel()
+            await asyncio.wait({self._db_writer_task})
+        try:
+            await self.db.write_queued_trades(wait=False, limit=None)
+        except Exception as e:
+            logger.warning(f"Could not flush queued trade writes: {e}")
         try:
             await self.position_manager.compute_daily_stats()
         except Exception as e:
@@ -170,92 +269,115 @@ class TradingEngine:
 
     # --- WebSocket Handlers ---
 
-    async def _on_kline(self, data: dict):
+    def _on_stream_message(self, kind: int, data: dict):
+        """Single sync dispatch for every WS frame; async work is only spawned when a trigger fires."""
+        if kind == STREAM_KLINE:
+            self._on_kline(data)
+        elif kind == STREAM_BOOK_TICKER:
+            self._on_book_ticker(data)
+        else:
+            self._on_mark_price(data)
+
+    def _on_kline(self, data: dict):
         """Handle incoming kline data - check SL/TP/liquidation on kline updates."""
-        self.candle_store.update_from_kline(data)
+        # Reuse the store's parsed candle instead of float()-ing the same strings again
+        candle = self.candle_store.update_from_kline(data)
+        if candle is None:
+            return  # same open candle, same close/high/low: nothing new to mark or check
+        if candle.is_closed and data["k"]["i"] == "1m" and not self._new_candle_event.is_set():
+            self._last_candle_close = time.monotonic()
+            self._new_candle_event.set()
 
         pair = data["s"]
-        kline = data["k"]
-        price = float(kline["c"])
-        high = float(kline["h"])
-        low = float(kline["l"])
+        position = self.paper_trader.positions.get(pair)
+        if position is None:
+            return  # most pairs have no position: nothing to mark or check
 
-        # Update position with latest price
-        self.paper_trader.update_position_price(pair, price)
+        price = candle.close
+        high = candle.high
+        low = candle.low
 
-        # Update trailing stops
-        self.paper_trader.update_trailing_stops(pair)
+        # Mark to the latest price and update trailing stops
+        self.paper_trader.mark_price(position, price)
 
         # Check SL/TP/liquidation using candle HIGH and LOW (catches wicks)
-        position = self.paper_trader.positions.get(pair)
-        if position:
+        if pair not in self._closing:
+            # Fast path: candle range is clear of every trigger level
+            band_lo, band_hi = self.paper_trader.trigger_band(position)
+            if band_lo < low and high < band_hi:
+                return
+
             # Grace period: let position breathe for 15 seconds after opening
-            hold_seconds = (datetime.utcnow() - position.opened_at).total_seconds()
+            hold_seconds = time.monotonic() - position.opened_at_mono
             if hold_seconds < 15:
                 # Only check liquidation during grace period (safety net)
-                liq_trigger = None
-                if position.direction.value == "LONG" and position.liquidation_price > 0 and low <= position.liquidation_price:
-                    liq_trigger = "liq"
-                elif position.direction.value == "SHORT" and position.liquidation_price > 0 and high >= position.liquidation_price:
-                    liq_trigger = "liq"
-                if liq_trigger:
-                    trade = await self.paper_trader.close_position(pair, position.liquidation_price, f"LIQUIDATED at {price:.4f}")
-                    if trade:
-                        await self.memory.record_trade(trade, {}, self._current_regime)
+                liq = position.liquidation_price
+                if position.has_liquidation and (low <= liq if position.is_long else high >= liq):
+                    self._spawn_close(pair, liq, f"LIQUIDATED at {price:.4f}", cooldown=False)
                 return
 
-            trigger = None
-            if position.direction.value == "LONG":
-                trigger = self.paper_trader.check_stop_loss_take_profit(pair, low)
-                if not trigger:
-                    trigger = self.paper_trader.check_stop_loss_take_profit(pair, high)
-            else:
-                trigger = self.paper_trader.check_stop_loss_take_profit(pair, high)
-                if not trigger:
-                    trigger = self.paper_trader.check_stop_loss_take_profit(pair, low)
-
-            if not trigger:
-                trigger = self.paper_trader.check_stop_loss_take_profit(pair, price)
-
+            # One pass over the candle range (low/high bound the close as well)
+            trigger = self.paper_trader.check_sl_tp_range(position, low, high)
             if trigger:
                 if trigger == "liq":
-                    reason = f"LIQUIDATED at {price:.4f}"
-                    trade = await self.paper_trader.close_position(pair, position.liquidation_price, reason)
+                    self._spawn_close(pair, position.liquidation_price, f"LIQUIDATED at {price:.4f}")
                 elif trigger == "sl":
-                    reason = f"Stop loss hit at {price:.4f}"
-                    trade = await self.paper_trader.close_position(pair, position.stop_loss, reason)
+                    self._spawn_close(pair, position.stop_loss, f"Stop loss hit at {price:.4f}")
                 elif trigger == "tp":
-                    reason = f"Take profit hit at {price:.4f}"
-                    trade = await self.paper_trader.close_position(pair, position.take_profit, reason)
+                    self._spawn_close(pair, position.take_profit, f"Take profit hit at {price:.4f}")
                 else:
-                    trade = await self.paper_trader.close_position(pair, price, trigger)
+                    self._spawn_close(pair, price, trigger)
 
-                if trade:
-                    self._pair_cooldown[pair] = datetime.utcnow()
-                    indicators = {}
-                    await self.memory.record_trade(trade, indicators, self._current_regime)
+    def _spawn_close(self, pair: str, price: float, reason: str, cooldown: bool = True):
+        """Close a triggered position in a background task (WS dispatch is sync)."""
+        self._closing.add(pair)
+        task = asyncio.create_task(self._close_triggered(pair, price, reason, cooldown))
+        self._bg_tasks.add(task)
+        task.add_done_callback(self._bg_tasks.discard)
 
-    async def _on_book_ticker(self, data: dict):
+    async def _close_triggered(self, pair: str, price: float, reason: str, cooldown: bool):
+        try:
+            trade = await self.paper_trader.close_position(pair, price, reason)
+            if trade:
+                if cooldown:
+                    self._start_cooldown(pair)
+                self._trade_write_q.put_nowait((trade, {}, self._current_regime))
+        except Exception as e:
+            self._log_error(f"[{pair}] Triggered close failed", e)
+        finally:
+            self._closing.discard(pair)
+
+    def _start_cooldown(self, pair: str):
+        expiry = time.monotonic() + PAIR_COOLDOWN_SECONDS
+        self._cooldown_until[pair] = expiry
+        heapq.heappush(self._cooldown_heap, (expiry, pair))
+
+    def _expire_cooldowns(self):
+        """Drop cooldowns that have run out. A pair closed again keeps its later expiry."""
+        now = time.monotonic()
+        heap = self._cooldown_heap
+        while heap and heap[0][0] <= now:
+            expiry, pair = heapq.heappop(heap)
+            if self._cooldown_until.get(pair) == expiry:
+                del self._cooldown_until[pair]
+
+    def _on_book_ticker(self, data: dict):
         """Handle incoming order book ticker - price tracking only (SL checked on kline)."""
-        self.orderbook_store.update_from_book_ticker(data)
+        book = self.orderbook_store.update_from_book_ticker(data)
 
         pair = data["s"]
-        if pair in self.paper_trader.positions:
-            mid = (float(data["b"]) + float(data["a"])) / 2
-            self.paper_trader.update_position_price(pair, mid)
-            self.paper_trader.update_trailing_stops(pair)
-
-    async def _on_agg_trade(self, data: dict):
-        """Handle aggregate trade data - price tracking only (SL checked on kline)."""
-        pair = data["s"]
-        if pair not in self.paper_trader.positions:
-            return
-
-        price = float(data["p"])
-        self.paper_trader.update_position_price(pair, price)
-        self.paper_trader.update_trailing_stops(pair)
-
-    async def _on_mark_price(self, data: dict):
+        position = self.paper_trader.positions.get(pair)
+        if position is not None:
+            mid = (book.bid_price + book.ask_price) / 2
+            # Peak/trough tracking runs every tick; the stop itself only needs refreshing
+            # a few times a second (klines always refresh it before checking SL/TP)
+            now = time.monotonic()
+            trail = now - self._last_trail_update.get(pair, 0.0) >= TRAIL_UPDATE_INTERVAL
+            if trail:
+                self._last_trail_update[pair] = now
+            self.paper_trader.mark_price(position, mid, trail)
+
+    def _on_mark_price(self, data: dict):
         """Handle markPrice stream - extract funding rates in real-time."""
         pair = data.get("s", "")
         funding_rate = float(data.get("r", 0))  # current funding rate
@@ -268,10 +390,18 @@ class TradingEngine:
         """Main loop: analyze each pair every ~30 seconds."""
         await asyncio.sleep(30)  # wait for data
 
+        # Backoff while waiting for candles / after errors; both reset after a good cycle
+        empty_sleep = 2.0
+        err_sleep = 5.0
+
         while self._running:
             try:
-                self.position_manager.check_new_day()
-                self.circuit_breaker.check_new_day(self.paper_trader.total_equity)
+                # Day rollover can only happen when the UTC day number changes
+                today = int(time.time()) // 86400
+                if today != self._last_day_utc:
+                    self._last_day_utc = today
+                    self.position_manager.check_new_day()
+                    self.circuit_breaker.check_new_day(self.paper_trader.total_equity)
 
                 params = await self.db.get_current_params()
                 self.risk_manager.update_params(params)
@@ -281,7 +411,14 @@ class TradingEngine:
                     self.risk_manager.update_fear_greed(self.sentiment.fear_greed)
 
                 # Fast regime detection every cycle
-                self._current_regime = self.market_analyzer.get_market_regime_consensus(self.pairs)
+                # (recomputed only when a closed candle has arrived since the last cycle)
+                epoch = self.candle_store.mutation_epoch
+                if epoch != self._regime_epoch:
+                    self._regime_consensus = self.market_analyzer.get_market_regime_consensus(self.pairs)
+                    self._regime_epoch = epoch
+                self._current_regime = self._regime_consensus
+
+                self._expire_cooldowns()
 
                 # Cache market summary for Claude's prompt (once per cycle, not per pair)
                 self._market_context = self.market_analyzer.get_market_summary(self.pairs)
@@ -295,128 +432,185 @@ class TradingEngine:
                         f"Accumulating data: {total_pairs_receiving} pairs receiving, "
                         f"max {max_count}/14 candles (need ~{max(0, 14-max_count)} more minutes)"
                     )
-                    await asyncio.sleep(10)
+                    await asyncio.sleep(empty_sleep)
+                    empty_sleep = min(empty_sleep * 1.5, 30)
                     continue
 
-                # Prioritize pairs with open positions
-                position_pairs = [p for p in active_pairs if p in self.paper_trader.positions]
-                other_pairs = [p for p in active_pairs if p not in self.paper_trader.positions]
-                ordered_pairs = position_pairs + other_pairs
+                # Prioritize pairs with open positions (single-pass partition)
+                positions = self.paper_trader.positions
+                ordered_pairs = []
+                other_pairs = []
+                for p in active_pairs:
+                    (ordered_pairs if p in positions else other_pairs).append(p)
+                ordered_pairs.extend(other_pairs)
 
                 # Score all pairs and sort by signal strength
-                scored_pairs = []
-                for pair in ordered_pairs:
-                    snapshot = self.market_analyzer.get_snapshot(pair)
-                    if snapshot:
-                        scored_pairs.append((pair, self._signal_score(snapshot)))
+                snapshots = [self.market_analyzer.get_snapshot(pair) for pair in ordered_pairs]
+                snapshots = [snap for snap in snapshots if snap]
+                snapshot_by_pair = {snap.pair: snap for snap in snapshots}
+                scored_pairs = list(zip(snapshot_by_pair, self._signal_scores(snapshots)))
 
                 # Sort by score descending, always analyze at least top 5
                 scored_pairs.sort(key=lambda x: x[1], reverse=True)
-                min_analyze = min(5, len(scored_pairs))
 
-                analyzed = 0
-                for pair, score in scored_pairs:
-                    if not self._running:
-                        break
-                    # Analyze if: has open position, score >= 2, or in top 5
-                    if pair not in self.paper_trader.positions and score < 2 and analyzed >= min_analyze:
-                        continue
+                # Analyze if: has open position, score >= 2, or in top 5
+                to_analyze = [
+                    pair for i, (pair, score) in enumerate(scored_pairs)
+                    if i < 5 or score >= 2 or pair in self.paper_trader.positions
+                ]
 
-                    await self._analyze_pair(pair, params)
-                    analyzed += 1
-                    await asyncio.sleep(0.3)
+                # Pair-independent / batchable memory lookups, once per cycle
+                active_rules = await self.memory.get_active_rules()
+                similar_by_pair = await self.memory.find_similar_batch(to_analyze, self._current_regime.value)
+                open_positions = self.position_manager.get_open_positions()
+
+                await asyncio.gather(*(
+                    self._analyze_pair(
+                        pair, snapshot_by_pair[pair], params, active_rules, similar_by_pair[pair], open_positions
+                    )
+                    for pair in to_analyze
+                ))
+                analyzed = len(to_analyze)
 
                 if self._analysis_count % 5 == 0:
                     top_scores = [(p, s) for p, s in scored_pairs[:5]]
                     logger.info(f"Cycle {self._analysis_count}: analyzed {analyzed}/{len(scored_pairs)}, top: {top_scores}")
 
                 self._analysis_count += 1
-                await asyncio.sleep(settings.analysis_interval_seconds)
+                empty_sleep = 2.0
+                err_sleep = 5.0
+                await self._wait_for_new_candle()
 
             except Exception as e:
-                logger.error(f"Analysis loop error: {e}", exc_info=True)
-                await asyncio.sleep(5)
-
-    def _signal_score(self, snapshot: MarketSnapshot) -> int:
-        """Score a pair's signal strength (0-15+). Higher = more interesting for Claude."""
-        adx = snapshot.adx or 0
-        rsi_7 = snapshot.rsi_7 or 50
-        bb_squeeze = snapshot.bb_squeeze or False
-        bb_pct = snapshot.bb_pct or 0.5
-        macd_hist = snapshot.macd_hist or 0
-        ema_alignment = snapshot.ema_alignment or 0
-        rsi_divergence = snapshot.rsi_divergence or "none"
-        consecutive = snapshot.consecutive_direction or 0
-        volume_buy_ratio = snapshot.volume_buy_ratio or 0.5
-        stoch_k = snapshot.stoch_rsi_k or 50
-
-        score = 0
-
-        if adx > 25: score += 2
-        elif adx > 18: score += 1
-
-        if rsi_7 < 25 or rsi_7 > 75: score += 2
-        elif rsi_7 < 35 or rsi_7 > 65: score += 1
-
-        if bb_squeeze: score += 2
-
-        if bb_pct < 0.05 or bb_pct > 0.95: score += 2
-        elif bb_pct < 0.15 or bb_pct > 0.85: score += 1
-
-        if abs(macd_hist) > 0: score += 1
-        if abs(ema_alignment) > 0.5: score += 1
-        if rsi_divergence != "none": score += 2
-        if abs(consecutive) >= 3: score += 2
-        if volume_buy_ratio < 0.3 or volume_buy_ratio > 0.7: score += 1
-        if stoch_k < 10 or stoch_k > 90: score += 1
-
-        return score
-
-    async def _analyze_pair(self, pair: str, params: dict):
-        """Analyze a single pair and execute Claude's decision."""
-        # Get market snapshot
-        snapshot = self.market_analyzer.get_snapshot(pair)
-        if not snapshot:
-            return
+                self._log_error("Analysis loop error", e)
+                await asyncio.sleep(err_sleep + random.uniform(0, 1))
+                err_sleep = min(err_sleep * 2, 60)
+
+    async def _wait_for_new_candle(self):
+        """Sleep until a 1m candle closes. analysis_interval_seconds is only a fallback for a
+        stalled stream, counted from when the next close was due rather than from now, so a
+        cycle ending mid-minute doesn't add a timeout cycle ahead of the next close."""
+        now = time.monotonic()
+        next_close_due = max(self._last_candle_close + 60, now) if self._last_candle_close else now
+        timeout = next_close_due - now + settings.analysis_interval_seconds
+        try:
+            await asyncio.wait_for(self._new_candle_event.wait(), timeout=timeout)
+            await asyncio.sleep(CANDLE_SETTLE_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        self._new_candle_event.clear()
+
+    @staticmethod
+    def _signal_scores(snapshots: list[MarketSnapshot]) -> list[int]:
+        """Score each pair's signal strength (0-15+). Higher = more interesting for Claude.
+        One feature row per snapshot (missing values take the neutral defaults), scored column-wise."""
+        if not snapshots:
+            return []
+        f = np.array([
+            (
+                s.adx or 0,
+                s.rsi_7 or 50,
+                bool(s.bb_squeeze),
+                s.bb_pct or 0.5,
+                s.macd_hist or 0,
+                s.ema_alignment or 0,
+                (s.rsi_divergence or "none") != "none",
+                s.consecutive_direction or 0,
+                s.volume_buy_ratio or 0.5,
+                s.stoch_rsi_k or 50,
+            )
+            for s in snapshots
+        ], dtype=np.float64)
+        adx, rsi_7, bb_squeeze, bb_pct, macd_hist, ema_alignment, rsi_div, consecutive, vbr, stoch_k = f.T
+
+        score = np.where(adx > 25, 2, np.where(adx > 18, 1, 0))
+        score += np.where((rsi_7 < 25) | (rsi_7 > 75), 2, np.where((rsi_7 < 35) | (rsi_7 > 65), 1, 0))
+        score += 2 * (bb_squeeze > 0)
+        score += np.where((bb_pct < 0.05) | (bb_pct > 0.95), 2, np.where((bb_pct < 0.15) | (bb_pct > 0.85), 1, 0))
+        score += np.abs(macd_hist) > 0
+        score += np.abs(ema_alignment) > 0.5
+        score += 2 * (rsi_div > 0)
+        score += 2 * (np.abs(consecutive) >= 3)
+        score += (vbr < 0.3) | (vbr > 0.7)
+        score += (stoch_k < 10) | (stoch_k > 90)
+        return score.tolist()
+
+    async def _analyze_pair(
+        self,
+        pair: str,
+        snapshot: MarketSnapshot,
+        params: dict,
+        active_rules: list[dict],
+        similar_trades: list[dict],
+        open_positions: list[dict],
+    ):
+        """Analyze a pair; context is gathered outside the limit so it overlaps in-flight Claude calls."""
+        try:
+            ctx = await self._build_context(pair, snapshot, active_rules, similar_trades)
+            if ctx is None:
+                return
+            async with self._analysis_sem:
+                if not self._running:
+                    return
+                await self._decide_and_execute(pair, ctx, params, open_positions)
+        except Exception as e:
+            self._log_error(f"[{pair}] Analysis error", e)
 
+    async def _build_context(
+        self, pair: str, snapshot: MarketSnapshot, active_rules: list[dict], similar_trades: list[dict]
+    ) -> Optional[dict]:
+        """Memory lookups for a pair's scored snapshot, or None if it should be skipped this cycle."""
         has_position = pair in self.paper_trader.positions
 
         # Per-pair cooldown: don't enter a pair that was just closed
-        if not has_position and pair in self._pair_cooldown:
-            elapsed = (datetime.utcnow() - self._pair_cooldown[pair]).total_seconds()
-            if elapsed < 180:  # 3-minute cooldown between trades on same pair
-                return
+        if not has_position and pair in self._cooldown_until:
+            return None
 
         # Min hold time: don't ask Claude about young positions (let SL/TP work)
         if has_position:
             position = self.paper_trader.positions[pair]
-            hold_minutes = (datetime.utcnow() - position.opened_at).total_seconds() / 60
+            hold_minutes = (time.monotonic() - position.opened_at_mono) / 60
             if hold_minutes < 3.0:
-                return  # Let the trade breathe — SL/TP protect it
+                return None  # Let the trade breathe — SL/TP protect it
 
         # Get context for Claude
         regime = self._current_regime.value
-        similar_trades = await self.memory.find_similar(pair, regime)
-        active_rules = await self.memory.get_active_rules()
-        open_positions = self.position_manager.get_open_positions()
-
-        # Check circuit breaker
-        cb_active, cb_reason = self.circuit_breaker.check(self.paper_trader.total_equity)
 
         # Get win-rate statistics
         pattern_stats = await self.memory.get_pattern_stats(
             pair=pair, direction="", market_regime=regime
         )
 
+        return {
+            "snapshot": snapshot,
+            "regime": regime,
+            "similar_trades": similar_trades,
+            "active_rules": active_rules,
+            "pattern_stats": pattern_stats,
+        }
+
+    async def _decide_and_execute(self, pair: str, ctx: dict, params: dict, open_positions: list[dict]):
+        """Ask Claude for a decision on a prepared context, validate it and execute."""
+        snapshot = ctx["snapshot"]
+        regime = ctx["regime"]
+
+        # Live state is read here, not in _build_context: other pairs may have opened or
+        # closed positions while this one waited for a slot. The open_positions list for
+        # the prompt is built once per cycle; validation below uses the live count.
+        has_position = pair in self.paper_trader.positions
+
+        # Check circuit breaker
+        cb_active, cb_reason = self.circuit_breaker.check(self.paper_trader.total_equity)
+
         # Ask Claude for decision
         decision = await self.claude_trader.make_decision(
             snapshot=snapshot,
             open_positions=open_positions,
-            similar_trades=similar_trades,
-            active_rules=active_rules,
+            similar_trades=ctx["similar_trades"],
+            active_rules=ctx["active_rules"],
             current_params=params,
             balance=self.paper_trader.balance,
-            pattern_stats=pattern_stats,
+            pattern_stats=ctx["pattern_stats"],
             market_regime=self._current_regime.value,
             market_context=self._market_context,
         )
@@ -448,9 +642,10 @@ class TradingEngine:
                     self.paper_trader.set_trailing_stop(pair, atr * 2.5)
 
                 # Store indicators with the trade
-                indicators = snapshot.model_dump(exclude_none=True, exclude={"timestamp"})
-                await self.db.update_trade(position.id, {
-                    "entry_indicators": str(indicators),
+                indicators = snapshot.to_indicators()
+                # Off the decision path: _db_writer_loop batches these
+                await self.db.queue_trade_update(position.id, {
+                    "entry_indicators": orjson.dumps(indicators).decode(),
                     "market_regime": regime,
                     "sentiment_score": snapshot.fear_greed,
                 })
@@ -458,19 +653,51 @@ class TradingEngine:
         elif decision.action == ActionType.EXIT:
             trade = await self.paper_trader.close_position(pair, price, decision.reasoning)
             if trade:
-                self._pair_cooldown[pair] = datetime.utcnow()
-                indicators = snapshot.model_dump(exclude_none=True, exclude={"timestamp"})
-                await self.memory.record_trade(trade, indicators, self._current_regime)
+                self._start_cooldown(pair)
+                self._trade_write_q.put_nowait((trade, snapshot.to_indicators(), self._current_regime))
 
         elif decision.action == ActionType.ADJUST:
             position = self.paper_trader.positions.get(pair)
             if position:
-                if decision.stop_loss:
-                    position.stop_loss = decision.stop_loss
-                if decision.take_profit:
-                    position.take_profit = decision.take_profit
+                position.stop_loss = decision.stop_loss or position.stop_loss
+                position.take_profit = decision.take_profit or position.take_profit
                 logger.info(f"[{pair}] Adjusted: SL={position.stop_loss} TP={position.take_profit}")
 
+    # --- DB Writer ---
+
+    async def _db_writer_loop(self):
+        """Write queued trade updates (entry indicators), batching whatever piled up.
+        A failed batch stays queued in the db and is retried with backoff."""
+        delay = 0.0
+        while self._running:
+            try:
+                await self.db.write_queued_trades()
+                delay = 0.0
+            except Exception as e:
+                delay = min(delay * 2 or DB_RETRY_BASE_SECONDS, DB_RETRY_MAX_SECONDS)
+                logger.error(f"Trade write batch failed, retrying in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+
+    def _take_trade_writes(self, limit: int) -> list[Optional[tuple[Trade, dict, MarketRegime]]]:
+        batch = []
+        while len(batch) < limit and not self._trade_write_q.empty():
+            batch.append(self._trade_write_q.get_nowait())
+        return batch
+
+    async def _trade_writer_loop(self):
+        """Record closed trades in memory, batching closes that land together (e.g. a wick through several SLs).
+        Runs until it reaches the None that stop() queues, so everything queued before it is recorded."""
+        while True:
+            batch = [await self._trade_write_q.get()] + self._take_trade_writes(TRADE_WRITE_BATCH - 1)
+            trades = [t for t in batch if t is not None]
+            if trades:
+                try:
+                    await self.memory.record_trades(trades)
+                except Exception as e:
+                    logger.error(f"Trade memory batch failed ({len(trades)} trades): {e}")
+            if len(trades) < len(batch):
+                return
+
     # --- Futures Data Loop ---
 
     async def _futures_data_loop(self):
@@ -516,16 +743,14 @@ class TradingEngine:
 
         while self._running:
             try:
-                for pair, position in list(self.paper_trader.positions.items()):
+                # Apply proportional funding (full rate every 8h) to every open position at once
+                rates = {}
+                for pair in self.paper_trader.positions:
                     rate = self.futures_data.get_funding_rate(pair)
-                    if rate is not None and rate != 0:
-                        hold_hours = (datetime.utcnow() - position.opened_at).total_seconds() / 3600
-                        # Apply proportional funding: full rate every 8h
-                        # Check interval is 30 min, so apply 30/480 = 6.25% of rate
-                        check_minutes = settings.funding_rate_check_minutes
-                        fraction = check_minutes / (8 * 60)
-                        proportional_rate = rate * fraction
-                        self.paper_trader.apply_funding_rate(pair, proportional_rate)
+                    if rate:
+                        rates[pair] = rate * self._funding_fraction
+                if rates:
+                    self.paper_trader.apply_funding_batch(rates)
 
             except Exception as e:
                 logger.error(f"Funding rate loop error: {e}")
@@ -583,7 +808,10 @@ class TradingEngine:
                     if "error" not in result:
                         # Update market regime
                         regime = result.get("market_regime", "unknown")
-                        self._current_regime = MarketRegime(regime) if regime in MarketRegime.__members__.values() else MarketRegime.UNKNOWN
+                        try:
+                            self._current_regime = MarketRegime(regime)
+                        except ValueError:
+                            self._current_regime = MarketRegime.UNKNOWN
 
                         # Update lessons
                         reviews = result.get("trade_reviews", [])
@@ -602,72 +830,87 @@ class TradingEngine:
 
                         logger.info(f"Deep analysis complete. Regime: {regime}, Reviews: {len(reviews)}")
 
-                self._last_deep_analysis = datetime.utcnow()
+                self._last_deep_analysis = time.time()
 
             except Exception as e:
-                logger.error(f"Deep analysis error: {e}", exc_info=True)
+                self._log_error("Deep analysis error", e)
 
             await asyncio.sleep(settings.deep_analysis_interval_hours * 3600)
 
-    # --- Optimization Loop ---
-
-    async def _optimization_loop(self):
-        """Run optimizer every 4 hours."""
-        await asyncio.sleep(7200)  # wait 2h before first optimization (need new trades first)
+    # --- Periodic Ticks (optimization, daily stats, health) ---
+
+    async def _scheduler_loop(self):
+        """Run the simple periodic ticks from one coroutine, earliest due first."""
+        now = time.monotonic()
+        # (due_at, seq, tick, interval_seconds); seq breaks ties so bound methods are never compared
+        schedule = [
+            (now, 0, self._daily_stats_tick, 3600),
+            (now, 1, self._health_check_tick, 30),
+            (now + 300, 3, self._wal_checkpoint_tick, 300),
+            # wait 2h before first optimization (need new trades first)
+            (now + 7200, 2, self._optimization_tick, settings.optimization_interval_hours * 3600),
+        ]
+        heapq.heapify(schedule)
 
         while self._running:
-            try:
-                if await self.optimizer.should_run():
-                    recent_trades = await self.db.get_trades(status="closed", limit=50)
-                    if len(recent_trades) >= 10:  # need sufficient data for meaningful optimization
-                        daily_stats = await self.position_manager.compute_daily_stats()
-                        changes = await self.optimizer.run(daily_stats, recent_trades)
-                        if changes:
-                            params = await self.db.get_current_params()
-                            self.risk_manager.update_params(params)
-
-                self._last_optimization = datetime.utcnow()
-
-            except Exception as e:
-                logger.error(f"Optimization loop error: {e}", exc_info=True)
-
-            await asyncio.sleep(settings.optimization_interval_hours * 3600)
+            due, seq, tick, interval = heapq.heappop(schedule)
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await tick()
+            # Next run is measured from the end of this one, like the old sleep-after-work loops
+            heapq.heappush(schedule, (time.monotonic() + interval, seq, tick, interval))
+
+    async def _optimization_tick(self):
+        """Run optimizer (every optimization_interval_hours)."""
+        try:
+            if await self.optimizer.should_run():
+                recent_trades = await self.db.get_trades(status="closed", limit=50)
+                if len(recent_trades) >= 10:  # need sufficient data for meaningful optimization
+                    daily_stats = await self.position_manager.compute_daily_stats()
+                    changes = await self.optimizer.run(daily_stats, recent_trades)
+                    if changes:
+                        params = await self.db.get_current_params()
+                        self.risk_manager.update_params(params)
 
-    # --- Daily Stats Loop ---
+            self._last_optimization = time.time()
 
-    async def _daily_stats_loop(self):
-        """Compute and save daily stats every hour."""
-        while self._running:
-            try:
-                await self.position_manager.compute_daily_stats()
-            except Exception as e:
-                logger.error(f"Daily stats error: {e}")
-            await asyncio.sleep(3600)
+        except Exception as e:
+            self._log_error("Optimization loop error", e)
 
-    # --- Health Check ---
+    async def _daily_stats_tick(self):
+        """Compute and save daily stats (every hour)."""
+        try:
+            await self.position_manager.compute_daily_stats()
+        except Exception as e:
+            logger.error(f"Daily stats error: {e}")
 
-    async def _health_check_loop(self):
-        """Monitor system health every 30 seconds."""
-        while self._running:
-            try:
-                if self.stream_manager and self.stream_manager.seconds_since_last_message > 60:
-                    logger.warning("No WebSocket data for >60s, streams may be disconnected")
-
-                # Log periodic status
-                if self._analysis_count > 0 and self._analysis_count % 10 == 0:
-                    equity = self.paper_trader.total_equity
-                    pnl = equity - self.paper_trader.initial_balance
-                    positions = len(self.paper_trader.positions)
-                    logger.info(
-                        f"Status: equity=${equity:.2f} pnl=${pnl:.2f} "
-                        f"positions={positions} regime={self._current_regime.value} "
-                        f"cycles={self._analysis_count}"
-                    )
+    async def _wal_checkpoint_tick(self):
+        """Keep the SQLite WAL file bounded (every 5 minutes)."""
+        try:
+            await self.db.checkpoint_wal()
+        except Exception as e:
+            self._log_error("WAL checkpoint error", e)
 
-            except Exception as e:
-                logger.error(f"Health check error: {e}")
+    async def _health_check_tick(self):
+        """Monitor system health (every 30 seconds)."""
+        try:
+            if self.stream_manager and self.stream_manager.seconds_since_last_message > 60:
+                logger.warning("No WebSocket data for >60s, streams may be disconnected")
+
+            # Log periodic status
+            if self._analysis_count > 0 and self._analysis_count % 10 == 0:
+                equity = self.paper_trader.total_equity
+                pnl = equity - self.paper_trader.initial_balance
+                positions = len(self.paper_trader.positions)
+                logger.info(
+                    f"Status: equity=${equity:.2f} pnl=${pnl:.2f} "
+                    f"positions={positions} regime={self._current_regime.value} "
+                    f"cycles={self._analysis_count}"
+                )
 
-            await asyncio.sleep(30)
+        except Exception as e:
+            logger.error(f"Health check error: {e}")
 
     # --- Status ---
 
@@ -680,7 +923,7 @@ class TradingEngine:
             "mode": "paper" if settings.paper_trading else "live",
             "started_at": self._started_at.isoformat() if self._started_at else None,
             "uptime_minutes": round(
-                (datetime.utcnow() - self._started_at).total_seconds() / 60, 1
+                (time.monotonic() - self._started_at_mono) / 60, 1
             ) if self._started_at else 0,
             "pairs": self.pairs,
             "active_pairs": self.candle_store.pairs_with_data,
@@ -692,7 +935,7 @@ class TradingEngine:
                 **self.circuit_breaker.status,
             },
             "ws_connected": self.stream_manager.is_connected if self.stream_manager else False,
-            "last_deep_analysis": self._last_deep_analysis.isoformat() if self._last_deep_analysis else None,
-            "last_optimization": self._last_optimization.isoformat() if self._last_optimization else None,
+            "last_deep_analysis": datetime.utcfromtimestamp(self._last_deep_analysis).isoformat() if self._last_deep_analysis else None,
+            "last_optimization": datetime.utcfromtimestamp(self._last_optimization).isoformat() if self._last_optimization else None,
             **self.position_manager.get_equity_summary(),
         }
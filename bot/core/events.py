@@ -2,6 +2,7 @@
 
 import asyncio
 import logging
+import time
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
@@ -31,15 +32,31 @@ class EventType(str, Enum):
 class Event:
     type: EventType
     data: Any
-    timestamp: datetime = field(default_factory=datetime.utcnow)
+    timestamp: int = field(default_factory=time.time_ns)  # epoch ns; see created_at for a datetime
+
+    @property
+    def created_at(self) -> datetime:
+        return datetime.utcfromtimestamp(self.timestamp / 1e9)
+
+
+_STOP = object()  # queue sentinel that ends a lane's worker
+
+# Market-data lanes are bounded and drop their oldest event when full (a newer tick
+# supersedes it); every other lane is unbounded so no trade/risk event is ever lost
+HIGH_FREQUENCY_EVENTS = frozenset({EventType.KLINE_UPDATE, EventType.BOOK_UPDATE, EventType.AGG_TRADE})
+HIGH_FREQUENCY_QUEUE_SIZE = 1024
 
 
 class EventBus:
-    """Simple pub/sub event bus using asyncio queues."""
+    """Pub/sub event bus: one queue and one worker per event type, so a slow handler
+    only delays its own event type."""
 
     def __init__(self):
         self._subscribers: dict[EventType, list[Callable]] = {}
-        self._queue: asyncio.Queue[Event] = asyncio.Queue()
+        self._queues: dict[EventType, asyncio.Queue] = {
+            t: asyncio.Queue(maxsize=HIGH_FREQUENCY_QUEUE_SIZE if t in HIGH_FREQUENCY_EVENTS else 0)
+            for t in EventType
+        }
         self._running = False
 
     def subscribe(self, event_type: EventType, handler: Callable[..., Coroutine]):
@@ -49,26 +66,45 @@ class EventBus:
         self._subscribers[event_type].append(handler)
 
     async def publish(self, event: Event):
-        """Put an event on the queue."""
-        await self._queue.put(event)
+        """Put an event on its type's queue; never waits."""
+        queue = self._queues[event.type]
+        if queue.full():
+            queue.get_nowait()  # bounded lanes only: drop the oldest
+        queue.put_nowait(event)
 
     async def start(self):
-        """Start processing events from the queue."""
+        """Process events until stop(): one worker per event type."""
         self._running = True
         logger.info("Event bus started")
+        async with asyncio.TaskGroup() as tg:
+            for event_type, queue in self._queues.items():
+                tg.create_task(self._worker(event_type, queue))
+
+    async def _worker(self, event_type: EventType, queue: asyncio.Queue):
         while self._running:
-            try:
-                event = await asyncio.wait_for(self._queue.get(), timeout=1.0)
-                handlers = self._subscribers.get(event.type, [])
-                for handler in handlers:
-                    try:
-                        await handler(event)
-                    except Exception as e:
-                        logger.error(f"Error in handler for {event.type}: {e}")
-            except asyncio.TimeoutError:
+            event = await queue.get()
+            if event is _STOP:
+                break
+            handlers = self._subscribers.get(event_type)
+            if not handlers:
                 continue
+            if len(handlers) == 1:
+                await self._dispatch(handlers[0], event)
+            else:
+                await asyncio.gather(*(self._dispatch(h, event) for h in handlers))
+
+    @staticmethod
+    async def _dispatch(handler: Callable[..., Coroutine], event: Event):
+        try:
+            await handler(event)
+        except Exception as e:
+            logger.error(f"Error in handler for {event.type}: {e}")
 
     async def stop(self):
         """Stop processing events."""
         self._running = False
+        for queue in self._queues.values():
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(_STOP)  # wake each worker
         logger.info("Event bus stopped")
@@ -1,6 +1,8 @@
 """Pydantic models for signals, orders, positions, trades, and memory."""
 
 from __future__ import annotations
+import time
+from dataclasses import dataclass, field, fields
 from datetime import datetime
 from enum import Enum
 from typing import Optional
@@ -35,7 +37,10 @@ class MarketRegime(str, Enum):
 
 # --- Market Snapshot sent to Claude ---
 
-class MarketSnapshot(BaseModel):
+@dataclass(slots=True, kw_only=True)
+class MarketSnapshot:
+    """Built internally from already-typed values once per pair per cycle: a plain
+    dataclass, no validation pass."""
     pair: str
     price: float
     change_1m: float = 0.0
@@ -93,7 +98,19 @@ class MarketSnapshot(BaseModel):
     breaking_news: Optional[str] = None
     sentiment: Optional[dict] = None
     fear_greed: Optional[int] = None
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = field(default_factory=datetime.utcnow)
+
+    def to_dict(self) -> dict:
+        """Fields that are set (not None); timestamp stays a datetime."""
+        return {k: v for k in _SNAPSHOT_FIELDS if (v := getattr(self, k)) is not None}
+
+    def to_indicators(self) -> dict:
+        """Set fields minus timestamp, as stored with trades and memories."""
+        return {k: v for k in _INDICATOR_FIELDS if (v := getattr(self, k)) is not None}
+
+
+_SNAPSHOT_FIELDS = tuple(f.name for f in fields(MarketSnapshot))
+_INDICATOR_FIELDS = tuple(k for k in _SNAPSHOT_FIELDS if k != "timestamp")
 
 
 # --- Claude Decision ---
@@ -113,7 +130,10 @@ class TradeDecision(BaseModel):
 
 # --- Position ---
 
-class Position(BaseModel):
+# Plain slotted dataclass, not pydantic: positions are mutated on every WS tick
+# (price, PnL, peaks, trailing SL) and only ever built from already-typed values.
+@dataclass(slots=True, kw_only=True)
+class Position:
     id: str
     pair: str
     direction: Direction
@@ -128,7 +148,8 @@ class Position(BaseModel):
     realized_pnl: float = 0.0
     entry_fee: float = 0.0
     funding_paid: float = 0.0  # total funding rate costs accumulated
-    opened_at: datetime = Field(default_factory=datetime.utcnow)
+    opened_at: datetime = field(default_factory=datetime.utcnow)  # wall clock, for DB/API
+    opened_at_mono: float = field(default_factory=time.monotonic)  # for age checks on the hot path
     entry_reasoning: str = ""
     entry_indicators: Optional[dict] = None
     # Trailing stop
@@ -137,6 +158,13 @@ class Position(BaseModel):
     lowest_price: float = 999999.0  # track trough for trailing SL on shorts
     # Liquidation
     liquidation_price: float = 0.0
+    # Derived once at construction; read on every kline tick
+    is_long: bool = field(init=False)
+    has_liquidation: bool = field(init=False)
+
+    def __post_init__(self):
+        self.is_long = self.direction is Direction.LONG
+        self.has_liquidation = self.liquidation_price > 0
 
 
 # --- Closed Trade ---
@@ -1,8 +1,8 @@
 """In-memory OHLCV candle storage (500 candles x 20 pairs x 2 timeframes)."""
 
 import logging
-from collections import defaultdict, deque
-from dataclasses import dataclass, field
+from dataclasses import dataclass, replace
+from operator import attrgetter
 from typing import Optional
 
 import numpy as np
@@ -11,6 +11,17 @@ import pandas as pd
 logger = logging.getLogger(__name__)
 
 MAX_CANDLES = 500
+MINUTE_MS = 60_000
+FIVE_MIN_MS = 5 * MINUTE_MS
+
+DF_COLUMNS = [
+    "timestamp", "open", "high", "low", "close", "volume",
+    "quote_volume", "trades", "taker_buy_volume", "taker_buy_quote_volume",
+]
+_df_row = attrgetter(*DF_COLUMNS)
+CANDLE_DTYPE = np.dtype([
+    (c, "i8" if c in ("timestamp", "trades") else "f8") for c in DF_COLUMNS
+])
 
 
 @dataclass
@@ -28,25 +39,133 @@ class Candle:
     is_closed: bool
 
 
+class CandleRing:
+    """Fixed-capacity ring of closed candles, stored column-wise in one structured array."""
+
+    __slots__ = ("buf", "head", "size", "version")
+
+    def __init__(self, capacity: int):
+        self.buf = np.zeros(capacity, dtype=CANDLE_DTYPE)
+        self.head = 0  # next slot to write
+        self.size = 0
+        self.version = 0  # bumped on every append
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, candle: Candle):
+        cap = len(self.buf)
+        self.buf[self.head] = _df_row(candle)
+        self.head = (self.head + 1) % cap
+        if self.size < cap:
+            self.size += 1
+        self.version += 1
+
+    def extend(self, rows: np.ndarray):
+        """Append many rows (CANDLE_DTYPE, oldest first) with slice copies."""
+        cap = len(self.buf)
+        rows = rows[-cap:] if cap else rows[:0]
+        n = len(rows)
+        if not n:
+            return
+        first = min(n, cap - self.head)
+        self.buf[self.head:self.head + first] = rows[:first]
+        self.buf[:n - first] = rows[first:]
+        self.head = (self.head + n) % cap
+        self.size = min(self.size + n, cap)
+        self.version += 1
+
+    def last(self) -> np.void:
+        return self.buf[self.head - 1]
+
+    def back(self, n: int) -> np.void:
+        """The row n closes before the newest (back(0) == last()); caller keeps n < len(self)."""
+        return self.buf[(self.head - 1 - n) % len(self.buf)]
+
+    def view(self, count: Optional[int] = None) -> np.ndarray:
+        """Newest `count` rows (all if None) in time order; a zero-copy slice unless they wrap."""
+        n = min(count, self.size) if count else self.size
+        start = self.head - n
+        if start >= 0:
+            return self.buf[start:self.head]
+        return np.concatenate((self.buf[start:], self.buf[:self.head]))
+
+
+def _fold(bar: Optional[Candle], minute: Candle, bucket: int) -> Candle:
+    """`bar` (None for an empty bucket) extended by one 1m candle, as an open candle at `bucket`."""
+    if bar is None:
+        return replace(minute, timestamp=bucket, is_closed=False)
+    return Candle(
+        timestamp=bucket,
+        open=bar.open,
+        high=max(bar.high, minute.high),
+        low=min(bar.low, minute.low),
+        close=minute.close,
+        volume=bar.volume + minute.volume,
+        quote_volume=bar.quote_volume + minute.quote_volume,
+        trades=bar.trades + minute.trades,
+        taker_buy_volume=bar.taker_buy_volume + minute.taker_buy_volume,
+        taker_buy_quote_volume=bar.taker_buy_quote_volume + minute.taker_buy_quote_volume,
+        is_closed=False,
+    )
+
+
+def _fold_rows(rows: np.ndarray, bucket: int) -> Optional[Candle]:
+    """Closed 1m ring rows (oldest first) folded into one open candle at `bucket`; None if empty."""
+    if not len(rows):
+        return None
+    return Candle(
+        timestamp=bucket,
+        open=float(rows["open"][0]),
+        high=float(rows["high"].max()),
+        low=float(rows["low"].min()),
+        close=float(rows["close"][-1]),
+        volume=float(rows["volume"].sum()),
+        quote_volume=float(rows["quote_volume"].sum()),
+        trades=int(rows["trades"].sum()),
+        taker_buy_volume=float(rows["taker_buy_volume"].sum()),
+        taker_buy_quote_volume=float(rows["taker_buy_quote_volume"].sum()),
+        is_closed=False,
+    )
+
+
+_NO_CANDLES = CandleRing(0)  # read-side stand-in for a (pair, timeframe) with no data yet
+
+
 class CandleStore:
     """Stores OHLCV data in memory for all pairs and timeframes."""
 
     def __init__(self, max_candles: int = MAX_CANDLES):
         self.max_candles = max_candles
-        # {pair: {timeframe: deque[Candle]}}
-        self._candles: dict[str, dict[str, deque]] = defaultdict(
-            lambda: defaultdict(lambda: deque(maxlen=max_candles))
-        )
-        self._current: dict[str, dict[str, Optional[Candle]]] = defaultdict(
-            lambda: defaultdict(lambda: None)
-        )
+        # Flat (pair, timeframe) keys: one lookup per access, rings created on first close
+        self._rings: dict[tuple[str, str], CandleRing] = {}
+        self._current: dict[tuple[str, str], Candle] = {}
+        # pair -> (5m bucket open time, its closed 1m candles folded together, None if none yet)
+        self._bucket_5m: dict[str, tuple[int, Optional[Candle]]] = {}
+        # Raw (open time, close, high, low) of each open candle's last update, to skip repeats
+        self._open_sig: dict[tuple[str, str], tuple] = {}
+        # Bumped on every closed-candle append; indicator-derived results keyed on it
+        # stay valid while it is unchanged
+        self.mutation_epoch = 0
+        # (pair, timeframe, count) -> (ring version, DataFrame); frames only change on a close
+        self._df_cache: dict[tuple[str, str, Optional[int]], tuple[int, pd.DataFrame]] = {}
 
-    def update_from_kline(self, data: dict):
-        """Update candle from Binance kline WebSocket message."""
+    def update_from_kline(self, data: dict) -> Optional[Candle]:
+        """Update candle from Binance kline WebSocket message. Returns the parsed candle,
+        or None for an open-candle update whose price range hasn't moved since the last one."""
         kline = data["k"]
         pair = data["s"]  # e.g., BTCUSDT
         tf = kline["i"]   # e.g., 1m, 5m
 
+        key = (pair, tf)
+        if kline["x"]:
+            self._open_sig.pop(key, None)
+        else:
+            sig = (kline["t"], kline["c"], kline["h"], kline["l"])
+            if self._open_sig.get(key) == sig:
+                return None
+            self._open_sig[key] = sig
+
         candle = Candle(
             timestamp=kline["t"],
             open=float(kline["o"]),
@@ -61,85 +180,134 @@ class CandleStore:
             is_closed=kline["x"],
         )
 
+        self.add_candle(pair, tf, candle)
+        if tf == "1m":
+            self._roll_up_5m(pair, candle)
+        return candle
+
+    def _roll_up_5m(self, pair: str, minute: Candle):
+        """Keep the 5m candle current from the 1m stream (no @kline_5m stream). The bucket's
+        closed minutes are folded together in _bucket_5m; the open 5m candle is that plus the
+        open 1m candle, so it moves on every 1m update. The bucket closes at its boundary: on
+        the close of its last minute, or on the first update from a later bucket if that close
+        was missed (a reconnect gap leaves it short of the missing minutes)."""
+        bucket = minute.timestamp - minute.timestamp % FIVE_MIN_MS
+        state = self._bucket_5m.get(pair)
+        if state is not None:
+            if state[0] > bucket:
+                return  # late update for a bucket that has already closed
+            if state[0] < bucket:
+                if state[1] is not None:
+                    self.add_candle(pair, "5m", replace(state[1], is_closed=True))
+                state = None
+        if state is None:
+            # Minutes of this bucket that closed before we tracked it (e.g. from a history load)
+            rows = self._ring(pair, "1m").view(5)
+            rows = rows[(rows["timestamp"] >= bucket) & (rows["timestamp"] < minute.timestamp)]
+            state = (bucket, _fold_rows(rows, bucket))
+        bar = _fold(state[1], minute, bucket)
+        if not minute.is_closed:
+            self._bucket_5m[pair] = state
+        elif minute.timestamp + MINUTE_MS == bucket + FIVE_MIN_MS:
+            bar.is_closed = True
+            self._bucket_5m[pair] = (bucket + FIVE_MIN_MS, None)
+        else:
+            self._bucket_5m[pair] = (bucket, bar)
+        self.add_candle(pair, "5m", bar)
+
+    def add_candle(self, pair: str, timeframe: str, candle: Candle):
+        """Store a closed candle, or replace the current one if it's still open."""
+        key = (pair, timeframe)
         if candle.is_closed:
-            self._candles[pair][tf].append(candle)
-            self._current[pair][tf] = None
+            ring = self._rings.get(key)
+            if ring is None:
+                ring = self._rings[key] = CandleRing(self.max_candles)
+            ring.append(candle)
+            self._current.pop(key, None)
+            self.mutation_epoch += 1
         else:
-            self._current[pair][tf] = candle
+            self._current[key] = candle
+
+    def add_closed_rows(self, pair: str, timeframe: str, rows: np.ndarray):
+        """Bulk-append closed candles (CANDLE_DTYPE rows, oldest first), e.g. from a history load."""
+        key = (pair, timeframe)
+        ring = self._rings.get(key)
+        if ring is None:
+            ring = self._rings[key] = CandleRing(self.max_candles)
+        ring.extend(rows)
+        self.mutation_epoch += 1
+
+    def _ring(self, pair: str, timeframe: str) -> CandleRing:
+        return self._rings.get((pair, timeframe), _NO_CANDLES)
 
     def get_candles(self, pair: str, timeframe: str = "1m", count: Optional[int] = None) -> list[Candle]:
         """Get closed candles for a pair + timeframe."""
-        candles = list(self._candles[pair][timeframe])
-        if count:
-            candles = candles[-count:]
-        return candles
+        rows = self._ring(pair, timeframe).view(count).tolist()
+        return [Candle(*row, is_closed=True) for row in rows]
+
+    def get_version(self, pair: str, timeframe: str = "1m") -> int:
+        """Changes whenever a closed candle is added for this pair + timeframe."""
+        return self._ring(pair, timeframe).version
 
     def get_current_candle(self, pair: str, timeframe: str = "1m") -> Optional[Candle]:
         """Get the current (not yet closed) candle."""
-        return self._current[pair][timeframe]
+        return self._current.get((pair, timeframe))
 
     def get_dataframe(self, pair: str, timeframe: str = "1m", count: Optional[int] = None) -> pd.DataFrame:
-        """Get candles as a pandas DataFrame for indicator calculation."""
-        candles = self.get_candles(pair, timeframe, count)
-        if not candles:
-            return pd.DataFrame()
-
-        df = pd.DataFrame([
-            {
-                "timestamp": c.timestamp,
-                "open": c.open,
-                "high": c.high,
-                "low": c.low,
-                "close": c.close,
-                "volume": c.volume,
-                "quote_volume": c.quote_volume,
-                "trades": c.trades,
-                "taker_buy_volume": c.taker_buy_volume,
-                "taker_buy_quote_volume": c.taker_buy_quote_volume,
-            }
-            for c in candles
-        ])
+        """Get candles as a pandas DataFrame for indicator calculation.
+        The frame is shared between callers until the next close: treat it as read-only."""
+        ring = self._ring(pair, timeframe)
+        key = (pair, timeframe, count)
+        cached = self._df_cache.get(key)
+        if cached is not None and cached[0] == ring.version:
+            return cached[1]
+
+        rows = ring.view(count)
+        # Column-wise copy out of the ring: no per-candle Python objects
+        df = pd.DataFrame(rows) if len(rows) else pd.DataFrame()
+        self._df_cache[key] = (ring.version, df)
         return df
 
     def get_latest_price(self, pair: str) -> Optional[float]:
         """Get the latest price for a pair."""
-        current = self._current[pair].get("1m")
+        current = self._current.get((pair, "1m"))
         if current:
             return current.close
-        candles_1m = self._candles[pair].get("1m")
+        candles_1m = self._ring(pair, "1m")
         if candles_1m:
-            return candles_1m[-1].close
+            return float(candles_1m.last()["close"])
         return None
 
     def get_price_change(self, pair: str, minutes: int = 1) -> Optional[float]:
         """Get price change as a percentage over the last N minutes."""
-        candles = self.get_candles(pair, "1m", count=minutes + 1)
-        if len(candles) < 2:
+        ring = self._ring(pair, "1m")
+        n = min(minutes, len(ring) - 1)  # as before: use what's there if history is short
+        if n < 1:
             return None
-        old_price = candles[0].close
-        new_price = candles[-1].close
+        old_price = float(ring.back(n)["close"])
+        new_price = float(ring.last()["close"])
         if old_price == 0:
             return None
         return (new_price - old_price) / old_price
 
     def get_volume_delta(self, pair: str, minutes: int = 5) -> Optional[float]:
         """Calculate volume delta (buy volume - sell volume) over N minutes."""
-        candles = self.get_candles(pair, "1m", count=minutes)
-        if not candles:
+        rows = self._ring(pair, "1m").view(minutes)
+        if not len(rows):
             return None
-        buy_vol = sum(c.taker_buy_quote_volume for c in candles)
-        total_vol = sum(c.quote_volume for c in candles)
+        buy_vol = float(rows["taker_buy_quote_volume"].sum())
+        total_vol = float(rows["quote_volume"].sum())
         sell_vol = total_vol - buy_vol
         return buy_vol - sell_vol
 
     def has_enough_data(self, pair: str, min_candles: int = 14) -> bool:
         """Check if we have enough data to calculate indicators."""
-        return len(self._candles[pair]["1m"]) >= min_candles
+        return len(self._ring(pair, "1m")) >= min_candles
 
     @property
     def pairs_with_data(self) -> list[str]:
-        return [p for p in self._candles if self.has_enough_data(p)]
+        return [p for (p, tf), ring in self._rings.items() if tf == "1m" and len(ring) >= 14]
 
     def get_candle_counts(self) -> dict[str, int]:
         """Get count of closed 1m candles per pair (for debugging)."""
-        return {p: len(self._candles[p]["1m"]) for p in self._candles}
+        return {p: len(ring) for (p, tf), ring in self._rings.items() if tf == "1m"}
@@ -5,14 +5,22 @@ import logging
 from typing import Optional
 
 import httpx
+import numpy as np
+import orjson
 
 from config.settings import settings
-from data.candles import CandleStore, Candle
+from data.candles import CANDLE_DTYPE, CandleStore, Candle
 
 logger = logging.getLogger(__name__)
 
 BINANCE_FAPI = "https://fapi.binance.com"
 BINANCE_FAPI_ALT = "https://fapi1.binance.com"
+# CANDLE_DTYPE field -> column index in a REST kline row
+_KLINE_COLUMNS = (
+    ("timestamp", 0), ("open", 1), ("high", 2), ("low", 3), ("close", 4), ("volume", 5),
+    ("quote_volume", 7), ("trades", 8), ("taker_buy_volume", 9), ("taker_buy_quote_volume", 10),
+)
+MAX_CONCURRENT_FETCHES = 5  # a 499-candle klines request weighs 2; far under the per-minute cap
 
 
 async def load_historical_candles(
@@ -62,16 +70,19 @@ async def load_historical_candles(
             logger.warning(f"Historical candle loader failed to connect: {e}")
             return 0
 
-        # Fetch candles for each pair and timeframe
-        for pair in pairs:
-            for tf in timeframes:
+        # Fetch candles for each pair and timeframe, a few requests in flight at a time
+        sem = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+
+        async def fetch(pair: str, tf: str) -> int:
+            async with sem:
                 try:
-                    count = await _fetch_klines(client, candle_store, base_url, pair, tf, limit)
-                    total_loaded += count
-                    # Small delay to avoid rate limits
-                    await asyncio.sleep(0.1)
+                    return await _fetch_klines(client, candle_store, base_url, pair, tf, limit)
                 except Exception as e:
                     logger.warning(f"Failed to load {pair} {tf} candles: {e}")
+                    return 0
+
+        counts = await asyncio.gather(*(fetch(pair, tf) for pair in pairs for tf in timeframes))
+        total_loaded = sum(counts)
 
         logger.info(f"Historical candle loading complete: {total_loaded} candles for {len(pairs)} pairs")
 
@@ -93,35 +104,33 @@ async def _fetch_klines(
         "limit": limit,
     })
     resp.raise_for_status()
-    data = resp.json()
-
-    count = 0
-    for k in data:
-        # Binance kline format: [open_time, open, high, low, close, volume, close_time,
-        #                         quote_volume, trades, taker_buy_volume, taker_buy_quote_volume, ignore]
-        # Skip the last candle (it's the current unclosed one)
-        is_closed = True  # Historical candles are all closed except possibly the last
-        if k == data[-1]:
-            is_closed = False  # Last candle might still be open
-
-        candle = Candle(
-            timestamp=k[0],
-            open=float(k[1]),
-            high=float(k[2]),
-            low=float(k[3]),
-            close=float(k[4]),
-            volume=float(k[5]),
-            quote_volume=float(k[7]),
-            trades=k[8],
-            taker_buy_volume=float(k[9]),
-            taker_buy_quote_volume=float(k[10]),
-            is_closed=is_closed,
-        )
-
-        if is_closed:
-            candle_store._candles[pair][timeframe].append(candle)
-            count += 1
-        else:
-            candle_store._current[pair][timeframe] = candle
-
-    return count
+    data = orjson.loads(resp.content)
+
+    if not data:
+        return 0
+
+    # Binance kline format: [open_time, open, high, low, close, volume, close_time,
+    #                         quote_volume, trades, taker_buy_volume, taker_buy_quote_volume, ignore]
+    # All rows are closed except the last, which is the current (open) candle
+    *closed, last = data
+    if closed:
+        cols = np.array(closed, dtype=object)
+        rows = np.empty(len(closed), dtype=CANDLE_DTYPE)
+        for name, idx in _KLINE_COLUMNS:
+            rows[name] = cols[:, idx].astype(rows.dtype[name])
+        candle_store.add_closed_rows(pair, timeframe, rows)
+
+    candle_store.add_candle(pair, timeframe, Candle(
+        timestamp=last[0],
+        open=float(last[1]),
+        high=float(last[2]),
+        low=float(last[3]),
+        close=float(last[4]),
+        volume=float(last[5]),
+        quote_volume=float(last[7]),
+        trades=last[8],
+        taker_buy_volume=float(last[9]),
+        taker_buy_quote_volume=float(last[10]),
+        is_closed=False,
+    ))
+    return len(closed)
@@ -12,7 +12,7 @@ class BookLevel:
     bid_qty: float
     ask_price: float
     ask_qty: float
-    update_time: float  # seconds
+    update_time: float  # epoch seconds (exchange event time when the message carries it)
 
 
 class OrderBookStore:
@@ -21,16 +21,18 @@ class OrderBookStore:
     def __init__(self):
         self._books: dict[str, BookLevel] = {}
 
-    def update_from_book_ticker(self, data: dict):
-        """Update from Binance bookTicker message."""
-        pair = data["s"]
-        self._books[pair] = BookLevel(
+    def update_from_book_ticker(self, data: dict) -> BookLevel:
+        """Update from Binance bookTicker message. Returns the parsed level."""
+        book = BookLevel(
             bid_price=float(data["b"]),
             bid_qty=float(data["B"]),
             ask_price=float(data["a"]),
             ask_qty=float(data["A"]),
-            update_time=time.time(),
+            # Binance's event time (ms) is already in the message: no clock read per tick
+            update_time=data["E"] / 1000 if "E" in data else time.time(),
         )
+        self._books[data["s"]] = book
+        return book
 
     def get(self, pair: str) -> Optional[BookLevel]:
         return self._books.get(pair)
@@ -57,7 +59,7 @@ class OrderBookStore:
         return (book.bid_price + book.ask_price) / 2
 
     def is_stale(self, pair: str, max_age_seconds: float = 5.0) -> bool:
-        """Check if book data is stale."""
+        """Check if book data is stale (age measured against the local wall clock)."""
         book = self._books.get(pair)
         if not book:
             return True
@@ -1,54 +1,70 @@
 """WebSocket multi-stream manager for Binance Futures data."""
 
 import asyncio
-import json
 import logging
 import time
+from collections import deque
 from typing import Callable, Optional
 
 import aiohttp
+import orjson
 
 logger = logging.getLogger(__name__)
 
 BINANCE_WS_BASE = "wss://fstream.binance.com"
 MAX_STREAMS_PER_CONNECTION = 200  # Binance limit
 
+# Stream kinds passed to the on_message callback
+STREAM_KLINE = 0
+STREAM_BOOK_TICKER = 1
+STREAM_MARK_PRICE = 2
+
+# Subscribed stream suffixes (after "<pair>@") -> kind
+_STREAM_KINDS = {
+    "kline_1m": STREAM_KLINE,
+    "bookTicker": STREAM_BOOK_TICKER,
+    "markPrice@1s": STREAM_MARK_PRICE,
+}
+
 
 class StreamManager:
     """Manages WebSocket connections to Binance Futures for multiple pairs."""
 
-    def __init__(self, pairs: list[str], on_kline: Callable, on_book_ticker: Callable, on_agg_trade: Callable, on_mark_price: Callable = None):
+    def __init__(self, pairs: list[str], on_message: Callable[[int, dict], None]):
         self.pairs = [p.lower() for p in pairs]
-        self.on_kline = on_kline
-        self.on_book_ticker = on_book_ticker
-        self.on_agg_trade = on_agg_trade
-        self.on_mark_price = on_mark_price
-        self._sessions: list[aiohttp.ClientSession] = []
-        self._ws_connections: list[aiohttp.ClientWebSocketResponse] = []
+        # Plain (sync) callback: called inline for every frame, must not block
+        self.on_message = on_message
+        self._session: Optional[aiohttp.ClientSession] = None  # shared by all batches and reconnects
+        self._ws_connections: set[aiohttp.ClientWebSocketResponse] = set()
         self._running = False
         self._reconnect_delay = 1
         self._last_message_time = 0.0
+        # Readers park decoded frames here; one dispatcher drains and coalesces them
+        self._inbox: deque[dict] = deque()
+        self._inbox_ready = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._tasks: list[asyncio.Task] = []  # one reader per connection batch
+        self._stream_kinds: dict[str, int] = {}  # full stream name -> kind, filled by _build_streams
 
     def _build_streams(self) -> list[str]:
-        """Build stream names for all pairs."""
-        streams = []
-        for pair in self.pairs:
-            streams.append(f"{pair}@kline_1m")
-            streams.append(f"{pair}@kline_5m")
-            streams.append(f"{pair}@bookTicker")
-            streams.append(f"{pair}@aggTrade")
-            streams.append(f"{pair}@markPrice@1s")  # funding rate + mark price
-        return streams
+        """Build stream names for all pairs (kline_1m, bookTicker, markPrice@1s) and the routing map.
+        5m candles are rolled up from kline_1m; markPrice carries the funding rate."""
+        self._stream_kinds = {
+            f"{pair}@{suffix}": kind for pair in self.pairs for suffix, kind in _STREAM_KINDS.items()
+        }
+        return list(self._stream_kinds)
 
     async def start(self):
         """Start all WebSocket streams."""
         self._running = True
         streams = self._build_streams()
+        self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(ttl_dns_cache=600))
 
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
         # Split into batches if needed
         for i in range(0, len(streams), MAX_STREAMS_PER_CONNECTION):
             batch = streams[i:i + MAX_STREAMS_PER_CONNECTION]
-            asyncio.create_task(self._connect_streams(batch))
+            self._tasks.append(asyncio.create_task(self._connect_streams(batch)))
 
         logger.info(f"Started streams for {len(self.pairs)} pairs ({len(streams)} streams)")
 
@@ -58,18 +74,19 @@ class StreamManager:
         url = f"{BINANCE_WS_BASE}/stream?streams={stream_path}"
 
         while self._running:
+            ws = None
             try:
-                session = aiohttp.ClientSession()
-                self._sessions.append(session)
-                ws = await session.ws_connect(url, heartbeat=20, receive_timeout=30)
-                self._ws_connections.append(ws)
+                ws = await self._session.ws_connect(url, heartbeat=20, receive_timeout=30)
+                self._ws_connections.add(ws)
                 self._reconnect_delay = 1
                 logger.info(f"WebSocket connected ({len(streams)} streams)")
 
                 async for msg in ws:
-                    if msg.type == aiohttp.WSMsgType.TEXT:
+                    # orjson takes str or bytes, so binary frames skip aiohttp's text decode
+                    if msg.type in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
                         self._last_message_time = time.time()
-                        await self._handle_message(json.loads(msg.data))
+                        self._inbox.append(orjson.loads(msg.data))
+                        self._inbox_ready.set()
                     elif msg.type == aiohttp.WSMsgType.ERROR:
                         logger.error(f"WebSocket error: {ws.exception()}")
                         break
@@ -79,46 +96,73 @@ class StreamManager:
             except Exception as e:
                 logger.error(f"WebSocket connection error: {e}")
             finally:
-                if ws and not ws.closed:
-                    await ws.close()
-                await session.close()
+                if ws is not None:
+                    self._ws_connections.discard(ws)
+                    if not ws.closed:
+                        await ws.close()
 
             if self._running:
                 logger.info(f"Reconnecting in {self._reconnect_delay}s...")
                 await asyncio.sleep(self._reconnect_delay)
                 self._reconnect_delay = min(self._reconnect_delay * 2, 60)
 
-    async def _handle_message(self, data: dict):
-        """Route message to the appropriate handler."""
-        if "stream" not in data or "data" not in data:
+    async def _dispatch_loop(self):
+        """Hand queued frames to the callback. When frames pile up (a burst read without
+        yielding), superseded updates are dropped: only the newest frame per stream is kept,
+        except closed klines, which are always delivered and keep their order."""
+        while self._running:
+            await self._inbox_ready.wait()
+            self._inbox_ready.clear()
+            inbox = self._inbox
+            if len(inbox) == 1:
+                self._handle_message(inbox.popleft())
+                continue
+
+            batch: list[dict] = []
+            slot: dict[str, int] = {}  # stream -> index of its replaceable frame in batch
+            while inbox:
+                data = inbox.popleft()
+                stream = data.get("stream")
+                i = slot.get(stream)
+                if i is None:
+                    i = slot[stream] = len(batch)
+                    batch.append(data)
+                else:
+                    batch[i] = data
+                payload = data.get("data")
+                if payload and payload.get("e") == "kline" and payload["k"]["x"]:
+                    del slot[stream]  # a closed candle is never overwritten
+            for data in batch:
+                self._handle_message(data)
+
+    def _handle_message(self, data: dict):
+        """Route message to the on_message callback with its stream kind."""
+        stream = data.get("stream")
+        payload = data.get("data")
+        if stream is None or payload is None:
             return
 
-        stream = data["stream"]
-        payload = data["data"]
+        kind = self._stream_kinds.get(stream)
+        if kind is None:
+            return
 
         try:
-            if "@kline_" in stream:
-                await self.on_kline(payload)
-            elif "@bookTicker" in stream:
-                await self.on_book_ticker(payload)
-            elif "@aggTrade" in stream:
-                await self.on_agg_trade(payload)
-            elif "@markPrice" in stream:
-                if self.on_mark_price:
-                    await self.on_mark_price(payload)
+            self.on_message(kind, payload)
         except Exception as e:
             logger.error(f"Error handling {stream}: {e}")
 
     async def stop(self):
         """Close all WebSocket connections."""
         self._running = False
-        for ws in self._ws_connections:
+        if self._dispatcher:
+            self._dispatcher.cancel()
+        for ws in list(self._ws_connections):
             if not ws.closed:
                 await ws.close()
-        for session in self._sessions:
-            await session.close()
         self._ws_connections.clear()
-        self._sessions.clear()
+        if self._session:
+            await self._session.close()
+            self._session = None
         logger.info("All WebSocket streams closed")
 
     @property
@@ -1,16 +1,60 @@
 """SQLite database: trades, memory, params, costs, daily_stats."""
 
 import aiosqlite
-import json
+import asyncio
 import logging
+import os
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Optional
+from typing import AsyncIterator, Optional
+
+import orjson
 from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
 DB_PATH = settings.db_path
 
+# Applied on every connect. WAL lets the API's readers run alongside the engine's writes,
+# and synchronous=NORMAL is crash-safe in WAL mode (only the last commits can roll back)
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",  # KiB, i.e. ~64 MB of page cache
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA wal_autocheckpoint=1000",
+)
+# Layout settings a database only takes at creation: applied when the file has no tables
+# yet, before WAL mode (page size can't change in WAL). 8 KB pages fit the JSON-heavy rows.
+NEW_DB_PRAGMAS = (
+    "PRAGMA page_size=8192",
+    "PRAGMA auto_vacuum=INCREMENTAL",
+)
+WAL_CHECKPOINT_BYTES = 64 * 1024 * 1024  # force a checkpoint once the -wal file passes this
+CACHED_STATEMENTS = 256  # sqlite3's prepared-statement LRU (default 128)
+TRADE_WRITE_QUEUE_SIZE = 1000  # queued trade updates before queue_trade_update waits
+TRADE_WRITE_BATCH = 32  # max queued trade updates per flush (one commit)
+
+# Narrow projections for the hot readers: skip the large TEXT columns (indicator JSON,
+# reasoning) they never look at
+OPEN_TRADE_COLUMNS = (
+    "id", "pair", "direction", "entry_price", "quantity", "leverage",
+    "margin_used", "entry_fee", "opened_at", "entry_reasoning",
+)
+SIMILAR_MEMORY_COLUMNS = (
+    "id", "trade_id", "pair", "direction", "pnl", "pnl_pct", "leverage",
+    "hold_time_minutes", "market_regime", "lesson_learned", "created_at",
+)
+
+
+def _dumps(value) -> str:
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def _projection(columns: Optional[tuple[str, ...]]) -> str:
+    return ", ".join(columns) if columns else "*"
+
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS trades (
     id TEXT PRIMARY KEY,
@@ -114,13 +158,60 @@ CREATE TABLE IF NOT EXISTS daily_stats (
     sharpe_ratio REAL
 );
 
-CREATE INDEX IF NOT EXISTS idx_trades_pair ON trades(pair);
-CREATE INDEX IF NOT EXISTS idx_trades_status ON trades(status);
+-- Composite indexes follow the (filter columns, ORDER BY column) of the queries below
 CREATE INDEX IF NOT EXISTS idx_trades_closed_at ON trades(closed_at);
-CREATE INDEX IF NOT EXISTS idx_memory_pair ON trade_memory(pair);
+CREATE INDEX IF NOT EXISTS idx_trades_opened ON trades(opened_at DESC);
+CREATE INDEX IF NOT EXISTS idx_trades_status_opened ON trades(status, opened_at DESC);
+CREATE INDEX IF NOT EXISTS idx_trades_pair_opened ON trades(pair, opened_at DESC);
+CREATE INDEX IF NOT EXISTS idx_trades_status_pair_time ON trades(status, pair, opened_at DESC);
+CREATE INDEX IF NOT EXISTS idx_trades_status_closed ON trades(status, closed_at DESC);
 CREATE INDEX IF NOT EXISTS idx_memory_regime ON trade_memory(market_regime);
-CREATE INDEX IF NOT EXISTS idx_costs_service ON api_costs(service);
+CREATE INDEX IF NOT EXISTS idx_memory_trade_id ON trade_memory(trade_id);
+CREATE INDEX IF NOT EXISTS idx_memory_created ON trade_memory(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_memory_pair_regime_created ON trade_memory(pair, market_regime, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_costs_created ON api_costs(created_at);
+CREATE INDEX IF NOT EXISTS idx_costs_service_created ON api_costs(service, created_at DESC);
+
+-- Single-column indexes superseded by the composites above (their leading column)
+DROP INDEX IF EXISTS idx_trades_pair;
+DROP INDEX IF EXISTS idx_trades_status;
+DROP INDEX IF EXISTS idx_memory_pair;
+DROP INDEX IF EXISTS idx_costs_service;
+
+-- Trade counters in daily_stats are maintained here as trades close; the hourly snapshot
+-- (snapshot_daily_stats) only writes balances, costs and drawdown. A day's first close
+-- seeds the balances from the previous day's row until the next snapshot.
+-- pnl_net is the day's net trade PnL minus its API and VPS costs. Closes add their PnL to
+-- it; the costs are charged by the snapshot (and rebuild_daily_trade_stats).
+CREATE TRIGGER IF NOT EXISTS trg_trade_closed AFTER UPDATE OF status ON trades
+WHEN NEW.status = 'closed' AND OLD.status != 'closed'
+BEGIN
+    INSERT INTO daily_stats (
+        date, starting_balance, ending_balance, pnl_gross, pnl_net,
+        total_trades, winning_trades, losing_trades, total_fees,
+        best_trade_pnl, worst_trade_pnl, avg_hold_time_minutes
+    ) VALUES (
+        substr(NEW.closed_at, 1, 10),
+        COALESCE((SELECT ending_balance FROM daily_stats ORDER BY date DESC LIMIT 1), 0),
+        COALESCE((SELECT ending_balance FROM daily_stats ORDER BY date DESC LIMIT 1), 0),
+        NEW.pnl + NEW.entry_fee + NEW.exit_fee, NEW.pnl,
+        1, NEW.pnl > 0, NEW.pnl <= 0, NEW.entry_fee + NEW.exit_fee,
+        NEW.pnl, NEW.pnl, NEW.hold_time_minutes
+    )
+    ON CONFLICT(date) DO UPDATE SET
+        pnl_gross = pnl_gross + excluded.pnl_gross,
+        pnl_net = pnl_net + excluded.pnl_net,
+        total_trades = total_trades + 1,
+        winning_trades = winning_trades + excluded.winning_trades,
+        losing_trades = losing_trades + excluded.losing_trades,
+        total_fees = total_fees + excluded.total_fees,
+        best_trade_pnl = CASE WHEN total_trades = 0 THEN excluded.best_trade_pnl
+                              ELSE MAX(best_trade_pnl, excluded.best_trade_pnl) END,
+        worst_trade_pnl = CASE WHEN total_trades = 0 THEN excluded.worst_trade_pnl
+                               ELSE MIN(worst_trade_pnl, excluded.worst_trade_pnl) END,
+        avg_hold_time_minutes = (avg_hold_time_minutes * total_trades + excluded.avg_hold_time_minutes)
+                                / (total_trades + 1);
+END;
 """
 
 
@@ -128,105 +219,280 @@ class Database:
     def __init__(self, db_path: str = DB_PATH):
         self.db_path = db_path
         self._db: Optional[aiosqlite.Connection] = None
+        self._tx_lock = asyncio.Lock()  # held by the outermost transaction()
+        self._tx_owner: Optional[asyncio.Task] = None  # task holding _tx_lock
+        self._tx_depth = 0  # transaction() nesting level of _tx_owner
+        # (kind, table, columns) -> SQL text; the column sets per table are fixed, so this
+        # stays tiny and identical text lets sqlite3 reuse the prepared statement
+        self._stmt_cache: dict[tuple, str] = {}
+        # Write-through caches for tables read on every decision but rarely written
+        self._params_cache: Optional[dict[str, float]] = None
+        self._rules_cache: Optional[list[dict]] = None
+        self._next_trade_seq = 0  # seeded from the trades table on connect
+        # (trade_id, fields) updates written off the caller's path by write_queued_trades.
+        # A batch whose write failed waits in _trade_retry and goes out first next time.
+        self._trade_q: asyncio.Queue[tuple[str, dict]] = asyncio.Queue(maxsize=TRADE_WRITE_QUEUE_SIZE)
+        self._trade_retry: list[tuple[str, dict]] = []
 
     async def connect(self):
-        self._db = await aiosqlite.connect(self.db_path)
+        self._db = await aiosqlite.connect(self.db_path, cached_statements=CACHED_STATEMENTS)
         self._db.row_factory = aiosqlite.Row
+        cursor = await self._db.execute("SELECT COUNT(*) FROM sqlite_master")
+        if (await cursor.fetchone())[0] == 0:
+            for pragma in NEW_DB_PRAGMAS:
+                await self._db.execute(pragma)
+        for pragma in PRAGMAS:
+            await self._db.execute(pragma)
         await self._db.executescript(SCHEMA)
         await self._db.commit()
+        await self._db.execute("PRAGMA optimize=0x10002")  # analyze only what looks stale
+        cursor = await self._db.execute(
+            "SELECT MAX(id) FROM trades WHERE id GLOB 't[0-9a-f]*' AND length(id) = 9"
+        )
+        last_id = (await cursor.fetchone())[0]
+        self._next_trade_seq = int(last_id[1:], 16) + 1 if last_id else 1
         logger.info(f"Database connected: {self.db_path}")
 
     async def close(self):
         if self._db:
+            try:
+                # Refresh planner stats from this session's queries; return freed pages
+                # (a no-op on databases created before auto_vacuum=INCREMENTAL)
+                await self._db.execute("PRAGMA optimize")
+                cursor = await self._db.execute("PRAGMA incremental_vacuum")
+                await cursor.fetchall()  # frees one page per step: run it to completion
+                await self._db.commit()
+            except Exception as e:
+                logger.warning(f"Database maintenance on close failed: {e}")
             await self._db.close()
 
+    async def checkpoint_wal(self) -> bool:
+        """Checkpoint and restart the WAL if it has grown past WAL_CHECKPOINT_BYTES.
+        Auto-checkpoints can't keep up while readers pin old pages; this catches up."""
+        try:
+            size = os.path.getsize(f"{self.db_path}-wal")
+        except OSError:
+            return False  # no WAL file (in-memory DB or not in WAL mode)
+        if size < WAL_CHECKPOINT_BYTES:
+            return False
+        async with self._tx_lock:  # not while another task's transaction is open
+            await self.db.execute("PRAGMA wal_checkpoint(RESTART)")
+        logger.info(f"WAL checkpointed ({size / 1e6:.0f} MB)")
+        return True
+
     @property
     def db(self) -> aiosqlite.Connection:
         assert self._db is not None, "Database not connected"
         return self._db
 
+    @asynccontextmanager
+    async def transaction(self):
+        """Group writes into one commit, rolled back if the block raises. Every write method
+        runs in one, so a standalone call commits on its own and a call inside a block joins it.
+        The connection is shared by all tasks: the outermost block holds _tx_lock until it
+        commits, so another task's writes wait instead of landing in (or rolling back with)
+        this one. Nested blocks in the same task are savepoints."""
+        if self._tx_owner is asyncio.current_task():
+            savepoint = f"tx{self._tx_depth}"
+            await self.db.execute(f"SAVEPOINT {savepoint}")
+            self._tx_depth += 1
+            try:
+                yield
+            except BaseException:
+                await self.db.execute(f"ROLLBACK TO {savepoint}")
+                self._params_cache = self._rules_cache = None  # may hold rolled-back writes
+                raise
+            finally:
+                self._tx_depth -= 1
+                await self.db.execute(f"RELEASE {savepoint}")
+            return
+        async with self._tx_lock:
+            self._tx_owner = asyncio.current_task()
+            self._tx_depth = 1
+            try:
+                if not self.db.in_transaction:
+                    await self.db.execute("BEGIN")
+                yield
+                await self.db.commit()
+            except BaseException:
+                await self.db.rollback()
+                self._params_cache = self._rules_cache = None
+                raise
+            finally:
+                self._tx_owner, self._tx_depth = None, 0
+
+    def _insert_sql(self, table: str, cols: tuple) -> str:
+        key = ("insert", table, cols)
+        sql = self._stmt_cache.get(key)
+        if sql is None:
+            sql = self._stmt_cache[key] = (
+                f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join(['?'] * len(cols))})"
+            )
+        return sql
+
+    def _update_sql(self, table: str, cols: tuple) -> str:
+        key = ("update", table, cols)
+        sql = self._stmt_cache.get(key)
+        if sql is None:
+            sets = ", ".join([f"{k} = ?" for k in cols])
+            sql = self._stmt_cache[key] = f"UPDATE {table} SET {sets} WHERE id = ?"
+        return sql
+
+    def _upsert_sql(self, table: str, cols: tuple, conflict: str) -> str:
+        """INSERT ... ON CONFLICT DO UPDATE; the update half reuses the inserted values."""
+        key = ("upsert", table, cols)
+        sql = self._stmt_cache.get(key)
+        if sql is None:
+            updates = ", ".join([f"{k} = excluded.{k}" for k in cols if k != conflict])
+            sql = self._stmt_cache[key] = (
+                f"{self._insert_sql(table, cols)} ON CONFLICT({conflict}) DO UPDATE SET {updates}"
+            )
+        return sql
+
+    @staticmethod
+    def _encode(values) -> list:
+        """Serialize dict/list values to JSON text on the event loop, before the row is
+        handed to the aiosqlite worker thread."""
+        return [_dumps(v) if isinstance(v, (dict, list)) else v for v in values]
+
+    async def _insert(self, table: str, row: dict):
+        async with self.transaction():
+            await self.db.execute(self._insert_sql(table, tuple(row)), self._encode(row.values()))
+
     # --- Trades ---
 
+    def next_trade_id(self) -> str:
+        """New trade id: a counter past the highest id already in the table. The 't' prefix
+        keeps these apart from older uuid-derived ids, which are pure hex."""
+        trade_id = f"t{self._next_trade_seq:08x}"
+        self._next_trade_seq += 1
+        return trade_id
+
     async def insert_trade(self, trade: dict):
-        cols = ", ".join(trade.keys())
-        placeholders = ", ".join(["?"] * len(trade))
-        values = [
-            json.dumps(v) if isinstance(v, (dict, list)) else v
-            for v in trade.values()
-        ]
-        await self.db.execute(
-            f"INSERT INTO trades ({cols}) VALUES ({placeholders})", values
-        )
-        await self.db.commit()
+        await self._insert("trades", trade)
 
     async def update_trade(self, trade_id: str, updates: dict):
-        sets = ", ".join([f"{k} = ?" for k in updates.keys()])
-        values = [
-            json.dumps(v) if isinstance(v, (dict, list)) else v
-            for v in updates.values()
-        ]
+        values = self._encode(updates.values())
         values.append(trade_id)
-        await self.db.execute(
-            f"UPDATE trades SET {sets} WHERE id = ?", values
-        )
-        await self.db.commit()
-
-    async def get_open_trades(self) -> list[dict]:
+        async with self.transaction():
+            await self.db.execute(self._update_sql("trades", tuple(updates)), values)
+
+    async def update_trades_many(self, updates: list[tuple[str, dict]]):
+        """Apply several update_trade calls: one executemany per column set, one commit."""
+        groups: dict[tuple, list] = {}
+        for trade_id, fields in updates:
+            values = self._encode(fields.values())
+            values.append(trade_id)
+            groups.setdefault(tuple(fields), []).append(values)
+        async with self.transaction():
+            for cols, rows in groups.items():
+                await self.db.executemany(self._update_sql("trades", cols), rows)
+
+    async def queue_trade_update(self, trade_id: str, updates: dict):
+        """update_trade without waiting for the write; only waits if the queue is full."""
+        await self._trade_q.put((trade_id, updates))
+
+    async def write_queued_trades(self, wait: bool = True, limit: Optional[int] = TRADE_WRITE_BATCH) -> int:
+        """Write queued trade updates in queue order under one commit (at most `limit`, all
+        if None, after any batch left by a failed write), first waiting for one to arrive if
+        `wait` and nothing is pending. Returns the number written. On error the batch is kept
+        for the next call and the error re-raised."""
+        q = self._trade_q
+        batch, self._trade_retry = self._trade_retry, []
+        if wait and not batch:
+            batch.append(await q.get())
+        while (limit is None or len(batch) < limit) and not q.empty():
+            batch.append(q.get_nowait())
+        if not batch:
+            return 0
+        try:
+            await self.update_trades_many(batch)
+        except BaseException:
+            self._trade_retry = batch
+            raise
+        return len(batch)
+
+    async def get_open_trades(self, columns: Optional[tuple[str, ...]] = OPEN_TRADE_COLUMNS) -> list[dict]:
         cursor = await self.db.execute(
-            "SELECT * FROM trades WHERE status = 'open' ORDER BY opened_at DESC"
+            f"SELECT {_projection(columns)} FROM trades WHERE status = 'open' ORDER BY opened_at DESC"
         )
         rows = await cursor.fetchall()
         return [dict(r) for r in rows]
 
+    @staticmethod
+    def _trade_filters(pair: Optional[str], status: Optional[str]) -> tuple[str, list]:
+        """WHERE clause shared by get_trades / iter_trades / count_trades."""
+        where = " WHERE 1=1"
+        params: list = []
+        if status:
+            where += " AND status = ?"
+            params.append(status)
+        if pair:
+            where += " AND pair = ?"
+            params.append(pair)
+        return where, params
+
     async def get_trades(
         self,
         pair: Optional[str] = None,
         status: Optional[str] = None,
         limit: int = 100,
         offset: int = 0,
-    ) -> list[dict]:
-        query = "SELECT * FROM trades WHERE 1=1"
-        params: list = []
-        if pair:
-            query += " AND pair = ?"
-            params.append(pair)
-        if status:
-            query += " AND status = ?"
-            params.append(status)
-        query += " ORDER BY opened_at DESC LIMIT ? OFFSET ?"
+        columns: Optional[tuple[str, ...]] = None,
+        as_dicts: bool = True,
+    ) -> list:
+        """Trades newest first; `columns` narrows the projection (all columns if None).
+        as_dicts=False returns the read-only aiosqlite.Row objects (row["col"] access, no .get)."""
+        where, params = self._trade_filters(pair, status)
+        query = f"SELECT {_projection(columns)} FROM trades" + where + " ORDER BY opened_at DESC LIMIT ? OFFSET ?"
         params.extend([limit, offset])
         cursor = await self.db.execute(query, params)
         rows = await cursor.fetchall()
-        return [dict(r) for r in rows]
+        return [dict(r) for r in rows] if as_dicts else rows
+
+    async def iter_trades(
+        self,
+        pair: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 1000,
+        offset: int = 0,
+    ) -> AsyncIterator[dict]:
+        """Yield trades row by row so large exports don't materialize the full list."""
+        where, params = self._trade_filters(pair, status)
+        query = "SELECT * FROM trades" + where + " ORDER BY opened_at DESC LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        async with self.db.execute(query, params) as cursor:
+            async for row in cursor:
+                yield dict(row)
 
     async def get_trade_by_id(self, trade_id: str) -> Optional[dict]:
         cursor = await self.db.execute("SELECT * FROM trades WHERE id = ?", [trade_id])
         row = await cursor.fetchone()
         return dict(row) if row else None
 
-    async def count_trades(self, status: Optional[str] = None) -> int:
-        if status:
-            cursor = await self.db.execute(
-                "SELECT COUNT(*) as cnt FROM trades WHERE status = ?", [status]
-            )
-        else:
-            cursor = await self.db.execute("SELECT COUNT(*) as cnt FROM trades")
+    async def count_trades(
+        self,
+        pair: Optional[str] = None,
+        status: Optional[str] = None,
+    ) -> int:
+        where, params = self._trade_filters(pair, status)
+        query = "SELECT COUNT(*) as cnt FROM trades" + where
+        cursor = await self.db.execute(query, params)
         row = await cursor.fetchone()
         return row["cnt"] if row else 0
 
     # --- Trade Memory ---
 
     async def insert_memory(self, memory: dict):
-        cols = ", ".join(memory.keys())
-        placeholders = ", ".join(["?"] * len(memory))
-        values = [
-            json.dumps(v) if isinstance(v, (dict, list)) else v
-            for v in memory.values()
-        ]
-        await self.db.execute(
-            f"INSERT INTO trade_memory ({cols}) VALUES ({placeholders})", values
-        )
-        await self.db.commit()
+        await self._insert("trade_memory", memory)
+
+    async def insert_memories(self, memories: list[dict]):
+        """Insert several trade memories (same keys) with one executemany and one commit."""
+        if not memories:
+            return
+        rows = [self._encode(m.values()) for m in memories]
+        async with self.transaction():
+            await self.db.executemany(self._insert_sql("trade_memory", tuple(memories[0])), rows)
 
     async def find_similar_trades(
         self,
@@ -234,141 +500,140 @@ class Database:
         market_regime: str,
         limit: int = 5,
     ) -> list[dict]:
-        # First try exact match (pair AND regime)
+        """Newest memories for a pair, same-regime ones first; one query."""
         cursor = await self.db.execute(
-            """SELECT * FROM trade_memory
-               WHERE pair = ? AND market_regime = ?
-               ORDER BY created_at DESC LIMIT ?""",
+            f"""SELECT {_projection(SIMILAR_MEMORY_COLUMNS)} FROM trade_memory
+               WHERE pair = ?
+               ORDER BY market_regime = ? DESC, created_at DESC LIMIT ?""",
             [pair, market_regime, limit],
         )
         rows = await cursor.fetchall()
-        results = [dict(r) for r in rows]
-
-        # If not enough, supplement with same pair (any regime)
-        if len(results) < limit:
-            remaining = limit - len(results)
-            seen_ids = {r["id"] for r in results}
-            cursor = await self.db.execute(
-                """SELECT * FROM trade_memory
-                   WHERE pair = ?
-                   ORDER BY created_at DESC LIMIT ?""",
-                [pair, remaining + 5],
-            )
-            rows = await cursor.fetchall()
-            for r in rows:
-                row = dict(r)
-                if row["id"] not in seen_ids and len(results) < limit:
-                    results.append(row)
-                    seen_ids.add(row["id"])
+        return [dict(r) for r in rows]
 
+    async def find_similar_trades_batch(
+        self,
+        pairs: list[str],
+        market_regime: str,
+        limit: int = 5,
+    ) -> dict[str, list[dict]]:
+        """find_similar_trades for several pairs in one query: per pair, regime matches first, then newest."""
+        results: dict[str, list[dict]] = {pair: [] for pair in pairs}
+        if not pairs:
+            return results
+        placeholders = ", ".join(["?"] * len(pairs))
+        cols = _projection(SIMILAR_MEMORY_COLUMNS)
+        cursor = await self.db.execute(
+            f"""SELECT {cols} FROM (
+                   SELECT {cols}, ROW_NUMBER() OVER (
+                       PARTITION BY pair
+                       ORDER BY market_regime = ? DESC, created_at DESC
+                   ) AS rn
+                   FROM trade_memory WHERE pair IN ({placeholders})
+               ) WHERE rn <= ? ORDER BY pair, rn""",
+            [market_regime, *pairs, limit],
+        )
+        rows = await cursor.fetchall()
+        for r in rows:
+            results[r["pair"]].append(dict(r))
         return results
 
-    async def get_recent_memories(self, limit: int = 20) -> list[dict]:
+    async def get_memory_by_trade_id(self, trade_id: str) -> Optional[dict]:
         cursor = await self.db.execute(
-            "SELECT * FROM trade_memory ORDER BY created_at DESC LIMIT ?", [limit]
+            "SELECT * FROM trade_memory WHERE trade_id = ? ORDER BY id DESC LIMIT 1", [trade_id]
+        )
+        row = await cursor.fetchone()
+        return dict(row) if row else None
+
+    async def get_recent_memories(
+        self, limit: int = 20, columns: Optional[tuple[str, ...]] = None, as_dicts: bool = True
+    ) -> list:
+        """Newest memories; `columns` and `as_dicts` as in get_trades."""
+        cursor = await self.db.execute(
+            f"SELECT {_projection(columns)} FROM trade_memory ORDER BY created_at DESC LIMIT ?", [limit]
         )
         rows = await cursor.fetchall()
-        return [dict(r) for r in rows]
+        return [dict(r) for r in rows] if as_dicts else rows
 
     async def update_memory_lesson(self, memory_id: int, lesson: str, tags: list[str]):
-        await self.db.execute(
-            "UPDATE trade_memory SET lesson_learned = ?, tags = ? WHERE id = ?",
-            [lesson, json.dumps(tags), memory_id],
-        )
-        await self.db.commit()
+        async with self.transaction():
+            await self.db.execute(
+                "UPDATE trade_memory SET lesson_learned = ?, tags = ? WHERE id = ?",
+                [lesson, _dumps(tags), memory_id],
+            )
 
     # --- Learned Rules ---
 
     async def insert_rule(self, rule: dict):
-        cols = ", ".join(rule.keys())
-        placeholders = ", ".join(["?"] * len(rule))
-        values = [
-            json.dumps(v) if isinstance(v, (dict, list)) else v
-            for v in rule.values()
-        ]
-        await self.db.execute(
-            f"INSERT INTO learned_rules ({cols}) VALUES ({placeholders})", values
-        )
-        await self.db.commit()
+        await self._insert("learned_rules", rule)
+        self._rules_cache = None
 
     async def get_active_rules(self) -> list[dict]:
-        cursor = await self.db.execute(
-            "SELECT * FROM learned_rules WHERE active = 1 ORDER BY confidence DESC"
-        )
-        rows = await cursor.fetchall()
-        return [dict(r) for r in rows]
-
-    async def update_rule_stats(self, rule_id: int, successful: bool):
-        if successful:
-            await self.db.execute(
-                """UPDATE learned_rules
-                    SET times_applied = times_applied + 1,
-                        times_successful = times_successful + 1,
-                        updated_at = ?
-                    WHERE id = ?""",
-                [datetime.utcnow().isoformat(), rule_id],
+        """Active rules, best first. Cached until a rule is added, updated or deactivated;
+        the list is shared, treat it as read-only."""
+        if self._rules_cache is None:
+            cursor = await self.db.execute(
+                "SELECT * FROM learned_rules WHERE active = 1 ORDER BY confidence DESC"
             )
-        else:
+            rows = await cursor.fetchall()
+            self._rules_cache = [dict(r) for r in rows]
+        return self._rules_cache
+
+    async def update_rule_stats(self, rule_id: int, successful: bool, now: Optional[str] = None):
+        """Count one application of a rule; pass `now` when updating several in a batch."""
+        now = now or datetime.utcnow().isoformat()
+        async with self.transaction():
             await self.db.execute(
                 """UPDATE learned_rules
                     SET times_applied = times_applied + 1,
+                        times_successful = times_successful + ?,
                         updated_at = ?
                     WHERE id = ?""",
-                [datetime.utcnow().isoformat(), rule_id],
+                [int(successful), now, rule_id],
             )
-        await self.db.commit()
+        self._rules_cache = None
 
     async def deactivate_poor_rules(self, min_applied: int = 5, max_success_rate: float = 0.35):
         """Auto-deactivate rules with poor success rate."""
-        cursor = await self.db.execute(
-            """SELECT id, rule, times_applied, times_successful FROM learned_rules
-               WHERE active = 1 AND times_applied >= ?""",
-            [min_applied],
-        )
-        rows = await cursor.fetchall()
-        deactivated = 0
-        for r in rows:
-            row = dict(r)
-            rate = row["times_successful"] / row["times_applied"] if row["times_applied"] > 0 else 0
-            if rate < max_success_rate:
-                await self.db.execute(
-                    "UPDATE learned_rules SET active = 0, updated_at = ? WHERE id = ?",
-                    [datetime.utcnow().isoformat(), row["id"]],
-                )
-                deactivated += 1
-                logger.info(f"Deactivated poor rule #{row['id']}: '{row['rule'][:50]}' ({rate:.0%} success)")
-        if deactivated:
-            await self.db.commit()
-        return deactivated
+        async with self.transaction():
+            cursor = await self.db.execute(
+                """UPDATE learned_rules SET active = 0, updated_at = ?
+                   WHERE active = 1 AND times_applied >= ?
+                     AND CAST(times_successful AS REAL) / times_applied < ?
+                   RETURNING id, rule, times_applied, times_successful""",
+                [datetime.utcnow().isoformat(), max(min_applied, 1), max_success_rate],
+            )
+            rows = await cursor.fetchall()
+        for row in rows:
+            rate = row["times_successful"] / row["times_applied"]
+            logger.info(f"Deactivated poor rule #{row['id']}: '{row['rule'][:50]}' ({rate:.0%} success)")
+        if rows:
+            self._rules_cache = None
+        return len(rows)
 
     # --- Parameters ---
 
     async def insert_param_change(self, change: dict):
-        cols = ", ".join(change.keys())
-        placeholders = ", ".join(["?"] * len(change))
-        values = [
-            json.dumps(v) if isinstance(v, (dict, list)) else v
-            for v in change.values()
-        ]
-        await self.db.execute(
-            f"INSERT INTO parameters ({cols}) VALUES ({placeholders})", values
-        )
-        await self.db.commit()
+        await self._insert("parameters", change)
 
     async def set_current_param(self, name: str, value: float):
         now = datetime.utcnow().isoformat()
-        await self.db.execute(
-            """INSERT INTO current_params (param_name, param_value, updated_at)
-               VALUES (?, ?, ?)
-               ON CONFLICT(param_name) DO UPDATE SET param_value = ?, updated_at = ?""",
-            [name, value, now, value, now],
-        )
-        await self.db.commit()
+        async with self.transaction():
+            await self.db.execute(
+                """INSERT INTO current_params (param_name, param_value, updated_at)
+                   VALUES (?, ?, ?)
+                   ON CONFLICT(param_name) DO UPDATE SET param_value = ?, updated_at = ?""",
+                [name, value, now, value, now],
+            )
+            if self._params_cache is not None:
+                self._params_cache[name] = float(value)
 
     async def get_current_params(self) -> dict[str, float]:
-        cursor = await self.db.execute("SELECT * FROM current_params")
-        rows = await cursor.fetchall()
-        return {r["param_name"]: r["param_value"] for r in rows}
+        """Served from a write-through cache after the first read (set_current_param keeps it current)."""
+        if self._params_cache is None:
+            cursor = await self.db.execute("SELECT param_name, param_value FROM current_params")
+            rows = await cursor.fetchall()
+            self._params_cache = {r["param_name"]: r["param_value"] for r in rows}
+        return dict(self._params_cache)
 
     async def get_param_history(self, param_name: Optional[str] = None, limit: int = 50) -> list[dict]:
         if param_name:
@@ -386,13 +651,7 @@ class Database:
     # --- API Costs ---
 
     async def insert_api_cost(self, cost: dict):
-        cols = ", ".join(cost.keys())
-        placeholders = ", ".join(["?"] * len(cost))
-        values = list(cost.values())
-        await self.db.execute(
-            f"INSERT INTO api_costs ({cols}) VALUES ({placeholders})", values
-        )
-        await self.db.commit()
+        await self._insert("api_costs", cost)
 
     async def get_api_costs(
         self,
@@ -442,17 +701,70 @@ class Database:
     # --- Daily Stats ---
 
     async def upsert_daily_stats(self, stats: dict):
-        cols = ", ".join(stats.keys())
-        placeholders = ", ".join(["?"] * len(stats))
-        updates = ", ".join([f"{k} = ?" for k in stats.keys() if k != "date"])
-        values = list(stats.values())
-        update_values = [v for k, v in stats.items() if k != "date"]
-        await self.db.execute(
-            f"""INSERT INTO daily_stats ({cols}) VALUES ({placeholders})
-                ON CONFLICT(date) DO UPDATE SET {updates}""",
-            values + update_values,
-        )
-        await self.db.commit()
+        async with self.transaction():
+            await self.db.execute(
+                self._upsert_sql("daily_stats", tuple(stats), "date"), list(stats.values())
+            )
+
+    async def snapshot_daily_stats(
+        self,
+        date: str,
+        starting_balance: float,
+        ending_balance: float,
+        total_api_costs: float,
+        other_costs: float,
+        max_drawdown_pct: float,
+    ) -> dict:
+        """Write the day's balance/cost snapshot and return the full row. The trade counters
+        come from trg_trade_closed; pnl_net is their net PnL minus API and other costs."""
+        costs = total_api_costs + other_costs
+        async with self.transaction():
+            cursor = await self.db.execute(
+                """INSERT INTO daily_stats (date, starting_balance, ending_balance,
+                                            total_api_costs, max_drawdown_pct, pnl_net)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(date) DO UPDATE SET
+                       starting_balance = excluded.starting_balance,
+                       ending_balance = excluded.ending_balance,
+                       total_api_costs = excluded.total_api_costs,
+                       max_drawdown_pct = excluded.max_drawdown_pct,
+                       pnl_net = pnl_gross - total_fees + excluded.pnl_net
+                   RETURNING *""",
+                [date, starting_balance, ending_balance, total_api_costs, max_drawdown_pct, -costs],
+            )
+            row = await cursor.fetchone()
+        return dict(row)
+
+    async def rebuild_daily_trade_stats(self, date: str, other_costs: float = 0.0):
+        """Recount a day's trade counters from the trades table (e.g. at startup, in case
+        trades closed under an older schema without the trigger). pnl_net is charged the
+        recorded API costs and `other_costs`, as in snapshot_daily_stats."""
+        async with self.transaction():
+            await self.db.execute(
+                """INSERT INTO daily_stats (
+                       date, starting_balance, ending_balance, pnl_gross, pnl_net,
+                       total_trades, winning_trades, losing_trades, total_fees,
+                       best_trade_pnl, worst_trade_pnl, avg_hold_time_minutes
+                   )
+                   SELECT ?, 0, 0,
+                          COALESCE(SUM(pnl + entry_fee + exit_fee), 0), COALESCE(SUM(pnl), 0) - ?,
+                          COUNT(*), COALESCE(SUM(pnl > 0), 0), COALESCE(SUM(pnl <= 0), 0),
+                          COALESCE(SUM(entry_fee + exit_fee), 0),
+                          COALESCE(MAX(pnl), 0), COALESCE(MIN(pnl), 0),
+                          COALESCE(AVG(hold_time_minutes), 0)
+                   FROM trades WHERE status = 'closed' AND substr(closed_at, 1, 10) = ?
+                   ON CONFLICT(date) DO UPDATE SET
+                       pnl_gross = excluded.pnl_gross,
+                       pnl_net = excluded.pnl_net - total_api_costs,
+                       total_trades = excluded.total_trades,
+                       winning_trades = excluded.winning_trades,
+                       losing_trades = excluded.losing_trades,
+                       total_fees = excluded.total_fees,
+                       best_trade_pnl = excluded.best_trade_pnl,
+                       worst_trade_pnl = excluded.worst_trade_pnl,
+                       avg_hold_time_minutes = excluded.avg_hold_time_minutes""",
+                [date, other_costs, date],
+            )
 
     async def get_daily_stats(self, limit: int = 30) -> list[dict]:
         cursor = await self.db.execute(
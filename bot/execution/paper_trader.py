@@ -1,7 +1,8 @@
 """Paper trading simulator with realistic Binance Futures execution."""
 
 import logging
-import uuid
+import math
+import time
 from datetime import datetime
 from typing import Optional
 
@@ -11,6 +12,14 @@ from db.database import Database
 
 logger = logging.getLogger(__name__)
 
+MAINT_MARGIN_RATE = 0.004  # Binance default maintenance margin rate
+# Isolated-margin liquidation price / entry price, (long, short), per leverage Binance allows
+# Long: liq = entry * (1 - 1/leverage + maintenance_margin_rate)
+# Short: liq = entry * (1 + 1/leverage - maintenance_margin_rate)
+_LIQ_FACTORS = {
+    lev: (1 - 1 / lev + MAINT_MARGIN_RATE, 1 + 1 / lev - MAINT_MARGIN_RATE) for lev in range(1, 126)
+}
+
 
 class PaperTrader:
     """Simulates Binance Futures execution with real fees, slippage, liquidation, and funding."""
@@ -19,8 +28,14 @@ class PaperTrader:
         self.db = db
         self.balance = initial_balance or settings.initial_balance
         self.initial_balance = self.balance
-        self.positions: dict[str, Position] = {}  # pair -> Position
+        self.positions: dict[str, Position] = {}  # pair -> Position; add/remove via add_position/_remove_position
         self._peak_balance = self.balance
+        # Running totals over self.positions, so equity reads don't walk every position
+        self._sum_margin = 0.0
+        self._sum_unrealized = 0.0
+        # Fill-price multipliers (1 + slippage, 1 - slippage): majors here, alts the default
+        self._fill_alt = (1 + settings.slippage_alt, 1 - settings.slippage_alt)
+        self._fill = {p: (1 + settings.slippage_major, 1 - settings.slippage_major) for p in MAJOR_PAIRS}
 
     async def open_position(self, decision: TradeDecision, current_price: float) -> Optional[Position]:
         """Open a new position based on Claude's decision."""
@@ -36,11 +51,11 @@ class PaperTrader:
         notional = margin * leverage
 
         # Apply slippage
-        slippage = settings.slippage_major if pair in MAJOR_PAIRS else settings.slippage_alt
+        worse_up, worse_down = self._fill.get(pair, self._fill_alt)
         if decision.direction == Direction.LONG:
-            entry_price = current_price * (1 + slippage)
+            entry_price = current_price * worse_up
         else:
-            entry_price = current_price * (1 - slippage)
+            entry_price = current_price * worse_down
 
         quantity = notional / entry_price
 
@@ -56,16 +71,16 @@ class PaperTrader:
         self.balance -= total_cost
 
         # Calculate liquidation price (isolated margin)
-        # Long: liq = entry * (1 - 1/leverage + maintenance_margin_rate)
-        # Short: liq = entry * (1 + 1/leverage - maintenance_margin_rate)
-        maint_rate = 0.004  # Binance default maintenance margin rate
+        liq_long, liq_short = _LIQ_FACTORS.get(leverage) or (
+            1 - 1 / leverage + MAINT_MARGIN_RATE, 1 + 1 / leverage - MAINT_MARGIN_RATE
+        )
         if decision.direction == Direction.LONG:
-            liq_price = entry_price * (1 - (1 / leverage) + maint_rate)
+            liq_price = entry_price * liq_long
         else:
-            liq_price = entry_price * (1 + (1 / leverage) - maint_rate)
+            liq_price = entry_price * liq_short
 
         position = Position(
-            id=str(uuid.uuid4())[:8],
+            id=self.db.next_trade_id(),
             pair=pair,
             direction=decision.direction,
             entry_price=entry_price,
@@ -83,9 +98,9 @@ class PaperTrader:
             liquidation_price=liq_price,
         )
 
-        self.positions[pair] = position
+        self.add_position(position)
 
-        # Save to DB
+        # Save to DB before returning, so every open position has a durable row
         await self.db.insert_trade({
             "id": position.id,
             "pair": pair,
@@ -116,17 +131,17 @@ class PaperTrader:
             return None
 
         # Apply slippage on exit
-        slippage = settings.slippage_major if pair in MAJOR_PAIRS else settings.slippage_alt
-        if position.direction == Direction.LONG:
-            exit_price = current_price * (1 - slippage)
+        worse_up, worse_down = self._fill.get(pair, self._fill_alt)
+        if position.is_long:
+            exit_price = current_price * worse_down
         else:
-            exit_price = current_price * (1 + slippage)
+            exit_price = current_price * worse_up
 
         notional = position.quantity * exit_price
         exit_fee = notional * settings.taker_fee
 
         # Calculate PnL
-        if position.direction == Direction.LONG:
+        if position.is_long:
             raw_pnl = (exit_price - position.entry_price) * position.quantity
         else:
             raw_pnl = (position.entry_price - exit_price) * position.quantity
@@ -139,8 +154,8 @@ class PaperTrader:
         self.balance += position.margin_used + net_pnl
         self._peak_balance = max(self._peak_balance, self.balance)
 
-        now = datetime.utcnow()
-        hold_minutes = (now - position.opened_at).total_seconds() / 60
+        now = datetime.utcnow()  # only for closed_at; hold time is a plain float subtract
+        hold_minutes = (time.monotonic() - position.opened_at_mono) / 60
 
         trade = Trade(
             id=position.id,
@@ -162,7 +177,8 @@ class PaperTrader:
             exit_reasoning=reason,
         )
 
-        # Update DB
+        # Update DB before dropping the position: a close that never reached the row would
+        # come back at the next start as an open position without SL/TP
         await self.db.update_trade(position.id, {
             "exit_price": exit_price,
             "pnl": trade.pnl,
@@ -174,7 +190,7 @@ class PaperTrader:
             "status": "closed",
         })
 
-        del self.positions[pair]
+        self._remove_position(pair)
 
         emoji = "+" if net_pnl > 0 else ""
         logger.info(
@@ -184,11 +200,29 @@ class PaperTrader:
         )
         return trade
 
+    def add_position(self, position: Position):
+        """Track an open position (new, or restored from the DB at startup)."""
+        self.positions[position.pair] = position
+        self._sum_margin += position.margin_used
+        self._sum_unrealized += position.unrealized_pnl
+
+    def _remove_position(self, pair: str):
+        position = self.positions.pop(pair)
+        if self.positions:
+            self._sum_margin -= position.margin_used
+            self._sum_unrealized -= position.unrealized_pnl
+        else:
+            self._sum_margin = self._sum_unrealized = 0.0  # drop accumulated rounding drift
+
     def update_position_price(self, pair: str, current_price: float):
         """Update unrealized PnL and peak/trough tracking for a position."""
         position = self.positions.get(pair)
-        if not position:
-            return
+        if position:
+            self.mark_price(position, current_price, trail=False)
+
+    def mark_price(self, position: Position, current_price: float, trail: bool = True):
+        """update_position_price (+ update_trailing_stops if trail) for a position the
+        caller already looked up: the WS handlers' per-tick path."""
         position.current_price = current_price
 
         # Track peak/trough for trailing stops
@@ -198,64 +232,88 @@ class PaperTrader:
             position.lowest_price = current_price
 
         # Update unrealized PnL (includes funding costs)
-        if position.direction == Direction.LONG:
-            position.unrealized_pnl = (current_price - position.entry_price) * position.quantity - position.funding_paid
+        if position.is_long:
+            unrealized = (current_price - position.entry_price) * position.quantity - position.funding_paid
         else:
-            position.unrealized_pnl = (position.entry_price - current_price) * position.quantity - position.funding_paid
+            unrealized = (position.entry_price - current_price) * position.quantity - position.funding_paid
+        self._sum_unrealized += unrealized - position.unrealized_pnl
+        position.unrealized_pnl = unrealized
+
+        if trail and position.trailing_stop_distance:
+            self._trail(position)
 
     def apply_funding_rate(self, pair: str, funding_rate: float) -> float:
         """Apply funding rate cost/credit to an open position.
         Returns the cost amount (positive = paid, negative = received)."""
-        position = self.positions.get(pair)
-        if not position:
-            return 0.0
-        notional = position.quantity * position.current_price
-        # Longs pay when rate is positive, shorts pay when rate is negative
-        if position.direction == Direction.LONG:
-            cost = notional * funding_rate
-        else:
-            cost = -notional * funding_rate
-        self.balance -= cost
-        position.funding_paid += cost
-        logger.info(
-            f"Funding {pair}: rate={funding_rate:.6f}, cost=${cost:.4f} "
-            f"({position.direction.value}), total_funding=${position.funding_paid:.4f}"
-        )
-        return cost
-
-    def check_stop_loss_take_profit(self, pair: str, current_price: float) -> Optional[str]:
-        """Check if SL/TP has been hit. Returns 'sl', 'tp', 'liq', or None."""
-        position = self.positions.get(pair)
-        if not position:
-            return None
-
-        # Check liquidation first (most critical)
-        if position.direction == Direction.LONG:
-            if position.liquidation_price > 0 and current_price <= position.liquidation_price:
+        return self.apply_funding_batch({pair: funding_rate})
+
+    def apply_funding_batch(self, rates: dict[str, float]) -> float:
+        """apply_funding_rate for several pairs (pair -> rate) with one balance update.
+        Pairs without a position are skipped. Returns the total cost."""
+        total = 0.0
+        applied = 0
+        for pair, funding_rate in rates.items():
+            position = self.positions.get(pair)
+            if position is None:
+                continue
+            notional = position.quantity * position.current_price
+            # Longs pay when rate is positive, shorts pay when rate is negative
+            cost = notional * funding_rate if position.is_long else -notional * funding_rate
+            position.funding_paid += cost
+            total += cost
+            applied += 1
+            logger.debug(
+                f"Funding {pair}: rate={funding_rate:.6f}, cost=${cost:.4f} "
+                f"({position.direction.value}), total_funding=${position.funding_paid:.4f}"
+            )
+        if applied:
+            self.balance -= total
+            logger.info(f"Funding applied to {applied} positions: total cost=${total:.4f}")
+        return total
+
+    @staticmethod
+    def check_sl_tp_range(position: Position, low: float, high: float) -> Optional[str]:
+        """Check a candle's [low, high] range against liquidation, SL and TP in that priority.
+        Returns 'liq', 'sl', 'tp', or None."""
+        if position.is_long:
+            if position.has_liquidation and low <= position.liquidation_price:
                 return "liq"
-            if position.stop_loss and current_price <= position.stop_loss:
+            if position.stop_loss and low <= position.stop_loss:
                 return "sl"
-            if position.take_profit and current_price >= position.take_profit:
+            if position.take_profit and high >= position.take_profit:
                 return "tp"
         else:
-            if position.liquidation_price > 0 and current_price >= position.liquidation_price:
+            if position.has_liquidation and high >= position.liquidation_price:
                 return "liq"
-            if position.stop_loss and current_price >= position.stop_loss:
+            if position.stop_loss and high >= position.stop_loss:
                 return "sl"
-            if position.take_profit and current_price <= position.take_profit:
+            if position.take_profit and low <= position.take_profit:
                 return "tp"
-
         return None
 
+    @staticmethod
+    def trigger_band(position: Position) -> tuple[float, float]:
+        """(lo, hi) such that prices strictly inside can't hit liquidation, SL or TP.
+        Lets the kline handler skip check_sl_tp_range with one range compare."""
+        if position.is_long:
+            lo = max(position.liquidation_price, position.stop_loss or 0)
+            hi = position.take_profit or math.inf
+        else:
+            hi = min((x for x in (position.liquidation_price, position.stop_loss) if x > 0), default=math.inf)
+            lo = position.take_profit or -math.inf
+        return lo, hi
+
     def update_trailing_stops(self, pair: str):
         """Update trailing stop based on price movement.
         IMPORTANT: Only activates after position is in profit to avoid
         immediately tightening Claude's carefully calculated SL."""
         position = self.positions.get(pair)
-        if not position or not position.trailing_stop_distance:
-            return
+        if position and position.trailing_stop_distance:
+            self._trail(position)
 
-        if position.direction == Direction.LONG:
+    @staticmethod
+    def _trail(position: Position):
+        if position.is_long:
             new_sl = position.highest_price - position.trailing_stop_distance
             # Only trail once in profit: new SL must be above entry price
             if new_sl > position.entry_price and new_sl > position.stop_loss:
@@ -276,13 +334,15 @@ class PaperTrader:
     @property
     def total_equity(self) -> float:
         """Balance + unrealized PnL of all positions."""
-        unrealized = sum(p.unrealized_pnl for p in self.positions.values())
-        margin_locked = sum(p.margin_used for p in self.positions.values())
-        return self.balance + margin_locked + unrealized
+        return self.balance + self._sum_margin + self._sum_unrealized
 
     @property
     def total_margin_used(self) -> float:
-        return sum(p.margin_used for p in self.positions.values())
+        return self._sum_margin
+
+    @property
+    def total_unrealized_pnl(self) -> float:
+        return self._sum_unrealized
 
     @property
     def margin_ratio(self) -> float:
@@ -1,6 +1,7 @@
 """Position tracking and PnL management."""
 
 import logging
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -10,6 +11,9 @@ from execution.paper_trader import PaperTrader
 
 logger = logging.getLogger(__name__)
 
+# VPS cost prorated daily ($6/month ÷ 30 = $0.20/day), charged against each day's pnl_net
+VPS_DAILY_COST = 6.0 / 30.0
+
 
 class PositionManager:
     """Tracks open positions, calculates realized/unrealized PnL, daily stats."""
@@ -19,16 +23,21 @@ class PositionManager:
         self.db = db
         self._today_start_balance: Optional[float] = None
         self._today_start: Optional[str] = None
+        # UTC day number -> ("YYYY-MM-DD", "YYYY-MM-DDT00:00:00"), rebuilt when the day rolls
+        self._day_num = -1
+        self._day_strings = ("", "")
 
     async def initialize(self):
         """Load open positions from DB and set today's starting balance."""
-        self._today_start = datetime.utcnow().strftime("%Y-%m-%d")
+        self._today_start = self._utc_day()[0]
         self._today_start_balance = self.trader.total_equity
+        await self.db.rebuild_daily_trade_stats(self._today_start, other_costs=VPS_DAILY_COST)
 
         # Load open trades from DB
         open_trades = await self.db.get_open_trades()
         for t in open_trades:
             from core.models import Direction
+            opened_at = datetime.fromisoformat(t["opened_at"])
             pos = Position(
                 id=t["id"],
                 pair=t["pair"],
@@ -40,14 +49,17 @@ class PositionManager:
                 take_profit=0,
                 margin_used=t["margin_used"],
                 entry_fee=t.get("entry_fee", 0),
-                opened_at=datetime.fromisoformat(t["opened_at"]),
+                opened_at=opened_at,
+                # Map the stored open time onto this process's monotonic clock
+                opened_at_mono=time.monotonic() - (datetime.utcnow() - opened_at).total_seconds(),
                 entry_reasoning=t.get("entry_reasoning", ""),
             )
-            self.trader.positions[t["pair"]] = pos
+            self.trader.add_position(pos)
             logger.info(f"Restored open position: {t['pair']} {t['direction']}")
 
     def get_open_positions(self) -> list[dict]:
         """Get all open positions as dicts."""
+        now = time.monotonic()
         return [
             {
                 "id": p.id,
@@ -61,9 +73,7 @@ class PositionManager:
                 "unrealized_pnl": round(p.unrealized_pnl, 4),
                 "stop_loss": p.stop_loss,
                 "take_profit": p.take_profit,
-                "hold_time_minutes": round(
-                    (datetime.utcnow() - p.opened_at).total_seconds() / 60, 1
-                ),
+                "hold_time_minutes": round((now - p.opened_at_mono) / 60, 1),
                 "opened_at": p.opened_at.isoformat(),
             }
             for p in self.trader.positions.values()
@@ -71,9 +81,7 @@ class PositionManager:
 
     def get_equity_summary(self) -> dict:
         """Get current equity and PnL summary."""
-        total_unrealized = sum(
-            p.unrealized_pnl for p in self.trader.positions.values()
-        )
+        total_unrealized = self.trader.total_unrealized_pnl
         return {
             "balance": round(self.trader.balance, 2),
             "total_equity": round(self.trader.total_equity, 2),
@@ -92,57 +100,51 @@ class PositionManager:
 
     async def compute_daily_stats(self) -> dict:
         """Compute stats for today."""
-        today = datetime.utcnow().strftime("%Y-%m-%d")
-        start = f"{today}T00:00:00"
-        end = f"{today}T23:59:59"
-
-        # Get today's closed trades
-        trades = await self.db.get_trades(status="closed", limit=1000)
-        today_trades = [
-            t for t in trades
-            if t.get("closed_at") and t["closed_at"][:10] == today
-        ]
-
-        pnl_gross = sum(t["pnl"] + t.get("entry_fee", 0) + t.get("exit_fee", 0) for t in today_trades)
-        total_fees = sum(t.get("entry_fee", 0) + t.get("exit_fee", 0) for t in today_trades)
-        pnl_net = sum(t["pnl"] for t in today_trades)
-        winning = [t for t in today_trades if t["pnl"] > 0]
-        losing = [t for t in today_trades if t["pnl"] <= 0]
-
-        # API costs for today
-        api_costs = await self.db.get_api_costs(since=start)
-        total_api_cost = sum(c["cost_usd"] for c in api_costs)
+        today, start = self._utc_day()
 
-        # Add VPS cost prorated daily ($6/month ÷ 30 = $0.20/day)
-        vps_daily_cost = 6.0 / 30.0
+        # Trade counters are kept current by a trigger on trades; only the snapshot is computed here
+        total_api_cost = await self.db.get_total_api_cost(since=start)
 
         starting = self._today_start_balance or self.trader.initial_balance
 
+        row = await self.db.snapshot_daily_stats(
+            date=today,
+            starting_balance=round(starting, 2),
+            ending_balance=round(self.trader.total_equity, 2),
+            total_api_costs=round(total_api_cost, 4),
+            other_costs=VPS_DAILY_COST,
+            max_drawdown_pct=round(self.trader.drawdown_pct * 100, 2),
+        )
         stats = {
             "date": today,
-            "starting_balance": round(starting, 2),
-            "ending_balance": round(self.trader.total_equity, 2),
-            "pnl_gross": round(pnl_gross, 4),
-            "pnl_net": round(pnl_net - total_api_cost - vps_daily_cost, 4),
-            "total_trades": len(today_trades),
-            "winning_trades": len(winning),
-            "losing_trades": len(losing),
-            "total_fees": round(total_fees, 4),
-            "total_api_costs": round(total_api_cost, 4),
-            "max_drawdown_pct": round(self.trader.drawdown_pct * 100, 2),
-            "best_trade_pnl": max((t["pnl"] for t in today_trades), default=0),
-            "worst_trade_pnl": min((t["pnl"] for t in today_trades), default=0),
-            "avg_hold_time_minutes": round(
-                sum(t.get("hold_time_minutes", 0) for t in today_trades) / max(len(today_trades), 1), 2
-            ),
+            "starting_balance": row["starting_balance"],
+            "ending_balance": row["ending_balance"],
+            "pnl_gross": round(row["pnl_gross"], 4),
+            "pnl_net": round(row["pnl_net"], 4),
+            "total_trades": row["total_trades"],
+            "winning_trades": row["winning_trades"],
+            "losing_trades": row["losing_trades"],
+            "total_fees": round(row["total_fees"], 4),
+            "total_api_costs": row["total_api_costs"],
+            "max_drawdown_pct": row["max_drawdown_pct"],
+            "best_trade_pnl": row["best_trade_pnl"],
+            "worst_trade_pnl": row["worst_trade_pnl"],
+            "avg_hold_time_minutes": round(row["avg_hold_time_minutes"], 2),
         }
-
-        await self.db.upsert_daily_stats(stats)
         return stats
 
+    def _utc_day(self) -> tuple[str, str]:
+        """Today's UTC date string and its start timestamp, formatted once per day."""
+        day_num = int(time.time() // 86400)
+        if day_num != self._day_num:
+            today = datetime.utcfromtimestamp(day_num * 86400).strftime("%Y-%m-%d")
+            self._day_num = day_num
+            self._day_strings = (today, f"{today}T00:00:00")
+        return self._day_strings
+
     def check_new_day(self):
         """Reset daily tracking if date changed."""
-        today = datetime.utcnow().strftime("%Y-%m-%d")
+        today = self._utc_day()[0]
         if today != self._today_start:
             self._today_start = today
             self._today_start_balance = self.trader.total_equity
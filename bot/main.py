@@ -57,11 +57,14 @@ async def main():
 
 
 if __name__ == "__main__":
+    # uvloop.run() replaces the deprecated uvloop.install() policy hook; both the
+    # engine and the uvicorn server share this loop since server.serve() is awaited
+    # inside main() rather than started via uvicorn.run().
     try:
         import uvloop
-        uvloop.install()
-        logger.info("Using uvloop")
     except ImportError:
         logger.info("uvloop not available, using default event loop")
-
-    asyncio.run(main())
+        asyncio.run(main())
+    else:
+        logger.info("Using uvloop")
+        uvloop.run(main())
@@ -134,15 +134,11 @@ def _consecutive_direction(close: pd.Series, count: int = 10) -> int:
     if changes.empty:
         return 0
 
-    streak = 0
-    last_sign = 1 if changes.iloc[-1] > 0 else -1
-    for val in reversed(changes.values):
-        current_sign = 1 if val > 0 else -1
-        if current_sign == last_sign:
-            streak += current_sign
-        else:
-            break
-    return streak
+    # Length of the trailing run of equal signs, signed by the last candle
+    signs = np.where(changes.values > 0, 1, -1)
+    breaks = np.flatnonzero(signs[::-1] != signs[-1])
+    run = breaks[0] if breaks.size else len(signs)
+    return int(run * signs[-1])
 
 
 def _ema_alignment(ema_9: float, ema_21: float, ema_50: float) -> float:
@@ -198,29 +194,26 @@ def _support_resistance(df: pd.DataFrame, lookback: int = 50) -> Optional[dict]:
     highs = recent["high"].values
     lows = recent["low"].values
 
-    # Find local maxima/minima (swing points)
-    swing_highs = []
-    swing_lows = []
-    for i in range(2, len(highs) - 2):
-        if highs[i] > highs[i-1] and highs[i] > highs[i-2] and highs[i] > highs[i+1] and highs[i] > highs[i+2]:
-            swing_highs.append(highs[i])
-        if lows[i] < lows[i-1] and lows[i] < lows[i-2] and lows[i] < lows[i+1] and lows[i] < lows[i+2]:
-            swing_lows.append(lows[i])
+    # Find local maxima/minima (swing points): strictly beyond both neighbours on each side
+    h = highs[2:-2]
+    lo = lows[2:-2]
+    swing_highs = h[(h > highs[1:-3]) & (h > highs[:-4]) & (h > highs[3:-1]) & (h > highs[4:])]
+    swing_lows = lo[(lo < lows[1:-3]) & (lo < lows[:-4]) & (lo < lows[3:-1]) & (lo < lows[4:])]
 
-    if not swing_highs and not swing_lows:
+    if not swing_highs.size and not swing_lows.size:
         return None
 
     result = {}
     # Nearest resistance (above price)
-    resistances = [h for h in swing_highs if h > price]
-    if resistances:
-        nearest_r = min(resistances)
+    resistances = swing_highs[swing_highs > price]
+    if resistances.size:
+        nearest_r = resistances.min()
         result["dist_to_resistance_pct"] = round((nearest_r - price) / price * 100, 4)
 
     # Nearest support (below price)
-    supports = [l for l in swing_lows if l < price]
-    if supports:
-        nearest_s = max(supports)
+    supports = swing_lows[swing_lows < price]
+    if supports.size:
+        nearest_s = supports.max()
         result["dist_to_support_pct"] = round((price - nearest_s) / price * 100, 4)
 
     return result if result else None
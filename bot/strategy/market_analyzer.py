@@ -4,6 +4,8 @@ import logging
 from datetime import datetime
 from typing import Optional
 
+import numpy as np
+
 from core.models import MarketSnapshot, MarketRegime
 from data.candles import CandleStore
 from data.orderbook import OrderBookStore
@@ -25,6 +27,9 @@ class MarketAnalyzer:
         self._sentiment: dict = {}
         self._fear_greed: Optional[int] = None
         self._breaking_news: Optional[str] = None
+        # (pair, timeframe) -> (candle version, indicators); indicators only read closed
+        # candles, so they are recomputed once per close instead of on every call
+        self._indicator_cache: dict[tuple[str, str], tuple[int, dict]] = {}
 
     def set_funding_rate(self, pair: str, rate: float):
         self._funding_rates[pair] = rate
@@ -49,6 +54,20 @@ class MarketAnalyzer:
     def set_breaking_news(self, news: Optional[str]):
         self._breaking_news = news
 
+    def _indicators(self, pair: str, timeframe: str = "1m") -> dict:
+        """calculate_all (1m) or calculate_5m (5m) for the pair, memoized per closed candle."""
+        version = self.candles.get_version(pair, timeframe)
+        key = (pair, timeframe)
+        cached = self._indicator_cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        df = self.candles.get_dataframe(pair, timeframe)
+        indicators = calculate_all(df) if timeframe == "1m" else calculate_5m(df)
+        # Plain Python scalars for MarketSnapshot (no validation pass to coerce numpy ones)
+        indicators = {k: v.item() if isinstance(v, np.generic) else v for k, v in indicators.items()}
+        self._indicator_cache[key] = (version, indicators)
+        return indicators
+
     def get_snapshot(self, pair: str) -> Optional[MarketSnapshot]:
         """Generate a full market snapshot for a single pair."""
         if not self.candles.has_enough_data(pair, min_candles=14):
@@ -59,12 +78,10 @@ class MarketAnalyzer:
             return None
 
         # Get indicator data from 1m candles
-        df_1m = self.candles.get_dataframe(pair, "1m")
-        indicators = calculate_all(df_1m)
+        indicators = self._indicators(pair, "1m")
 
         # Get 5m multi-timeframe indicators
-        df_5m = self.candles.get_dataframe(pair, "5m")
-        indicators_5m = calculate_5m(df_5m)
+        indicators_5m = self._indicators(pair, "5m")
 
         # Price changes
         change_1m = self.candles.get_price_change(pair, minutes=1)
@@ -146,7 +163,7 @@ class MarketAnalyzer:
         if df.empty or len(df) < 21:
             return MarketRegime.UNKNOWN
 
-        indicators = calculate_all(df)
+        indicators = self._indicators(pair, "1m")
         adx = indicators.get("adx", 0) or 0
         ema_align = indicators.get("ema_alignment", 0) or 0
         bb_width = indicators.get("bb_width", 0) or 0
@@ -0,0 +1,35 @@
+"""Shared fixtures. The bot runs with bot/ as its import root (`from config.settings ...`)."""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.database import Database  # noqa: E402
+
+
+@pytest.fixture
+def run():
+    """Run a coroutine to completion on a fresh event loop."""
+    return asyncio.run
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "test.db")
+
+
+async def open_db(path: str) -> Database:
+    db = Database(path)
+    await db.connect()
+    return db
+
+
+def trade_row(trade_id: str) -> dict:
+    return {
+        "id": trade_id, "pair": "BTCUSDT", "direction": "LONG", "entry_price": 100.0,
+        "quantity": 1.0, "leverage": 3, "opened_at": "2026-01-01T00:00:00", "status": "open",
+    }
@@ -0,0 +1,101 @@
+import numpy as np
+
+from data.candles import CANDLE_DTYPE, FIVE_MIN_MS, MINUTE_MS, CandleRing, CandleStore
+
+T0 = 1_700_000_100_000 - 1_700_000_100_000 % FIVE_MIN_MS  # a 5m bucket boundary
+
+
+def kline(ts: int, close: float, closed: bool, tf: str = "1m", volume: float = 1.0) -> dict:
+    return {"s": "BTCUSDT", "k": {
+        "t": ts, "i": tf, "x": closed,
+        "o": str(close - 1), "h": str(close + 1), "l": str(close - 2), "c": str(close),
+        "v": str(volume), "q": str(volume * close), "n": 1, "V": str(volume / 2), "Q": str(volume * close / 2),
+    }}
+
+
+def test_open_5m_bar_follows_the_open_1m_candle():
+    store = CandleStore()
+    store.update_from_kline(kline(T0, 100, closed=True))
+    store.update_from_kline(kline(T0 + MINUTE_MS, 105, closed=False))
+    bar = store.get_current_candle("BTCUSDT", "5m")
+    assert (bar.timestamp, bar.open, bar.close, bar.high, bar.volume) == (T0, 99, 105, 106, 2)
+    assert not bar.is_closed
+    store.update_from_kline(kline(T0 + MINUTE_MS, 110, closed=False))
+    assert store.get_current_candle("BTCUSDT", "5m").close == 110
+    assert not store.get_candles("BTCUSDT", "5m")
+
+
+def test_5m_bucket_closes_on_its_last_minute():
+    store = CandleStore()
+    for i in range(5):
+        store.update_from_kline(kline(T0 + i * MINUTE_MS, 100 + i, closed=True))
+    [bar] = store.get_candles("BTCUSDT", "5m")
+    assert (bar.timestamp, bar.open, bar.close, bar.high, bar.low, bar.volume) == (T0, 99, 104, 105, 98, 5)
+    assert store.get_current_candle("BTCUSDT", "5m") is None
+    store.update_from_kline(kline(T0 + FIVE_MIN_MS, 200, closed=False))
+    assert store.get_current_candle("BTCUSDT", "5m").open == 199
+    assert len(store.get_candles("BTCUSDT", "5m")) == 1
+
+
+def test_5m_bucket_closes_at_boundary_when_last_close_is_missed():
+    store = CandleStore()
+    for i in range(3):  # minutes 3 and 4 lost in a reconnect gap
+        store.update_from_kline(kline(T0 + i * MINUTE_MS, 100 + i, closed=True))
+    store.update_from_kline(kline(T0 + FIVE_MIN_MS, 200, closed=False))
+    [bar] = store.get_candles("BTCUSDT", "5m")
+    assert (bar.timestamp, bar.close, bar.volume) == (T0, 102, 3)
+    current = store.get_current_candle("BTCUSDT", "5m")
+    assert (current.timestamp, current.close, current.volume) == (T0 + FIVE_MIN_MS, 200, 1)
+
+
+def test_5m_bucket_picks_up_minutes_loaded_from_history():
+    store = CandleStore()
+    rows = np.zeros(2, dtype=CANDLE_DTYPE)
+    rows["timestamp"] = [T0, T0 + MINUTE_MS]
+    rows["open"], rows["high"], rows["low"], rows["close"], rows["volume"] = 50, 60, 40, 55, 3
+    store.add_closed_rows("BTCUSDT", "1m", rows)
+    store.update_from_kline(kline(T0 + 2 * MINUTE_MS, 100, closed=False))
+    bar = store.get_current_candle("BTCUSDT", "5m")
+    assert (bar.open, bar.low, bar.close, bar.volume) == (50, 40, 100, 7)
+
+
+def ring_rows(start: int, n: int) -> np.ndarray:
+    rows = np.zeros(n, dtype=CANDLE_DTYPE)
+    rows["timestamp"] = np.arange(start, start + n) * MINUTE_MS
+    rows["close"] = np.arange(start, start + n, dtype=float)
+    return rows
+
+
+def test_candle_ring_wraps_around_in_time_order():
+    ring = CandleRing(4)
+    ring.extend(ring_rows(0, 3))
+    ring.extend(ring_rows(3, 3))  # 6 rows into 4 slots: 0 and 1 are overwritten
+    assert len(ring) == 4
+    assert ring.view()["close"].tolist() == [2, 3, 4, 5]
+    assert ring.view(2)["close"].tolist() == [4, 5]
+    assert ring.last()["close"] == 5 and ring.back(3)["close"] == 2
+    ring.extend(ring_rows(6, 10))  # more rows than capacity: only the newest are kept
+    assert ring.view()["close"].tolist() == [12, 13, 14, 15]
+
+
+def test_candle_ring_view_aliases_only_when_not_wrapped():
+    ring = CandleRing(4)
+    ring.extend(ring_rows(0, 3))
+    assert np.shares_memory(ring.view(), ring.buf)
+    ring.extend(ring_rows(3, 2))
+    assert not np.shares_memory(ring.view(), ring.buf)  # wrapped: a concatenated copy
+    assert np.shares_memory(ring.view(1), ring.buf)
+
+
+def test_dataframe_is_a_copy_cached_until_the_next_close():
+    store = CandleStore(max_candles=4)
+    store.add_closed_rows("BTCUSDT", "1m", ring_rows(0, 3))
+    df = store.get_dataframe("BTCUSDT")
+    assert df["close"].tolist() == [0, 1, 2]
+    assert not np.shares_memory(df["close"].to_numpy(), store._ring("BTCUSDT", "1m").buf)
+    assert store.get_dataframe("BTCUSDT") is df
+    store.add_closed_rows("BTCUSDT", "1m", ring_rows(3, 2))  # wraps; old frame keeps its rows
+    assert df["close"].tolist() == [0, 1, 2]
+    fresh = store.get_dataframe("BTCUSDT")
+    assert fresh is not df and fresh["close"].tolist() == [1, 2, 3, 4]
+    assert fresh["timestamp"].tolist() == [c.timestamp for c in store.get_candles("BTCUSDT")]
@@ -0,0 +1,215 @@
+import asyncio
+
+import pytest
+
+from conftest import open_db, trade_row
+
+
+def test_transaction_commits_once_and_rolls_back_on_error(run, db_path):
+    async def main():
+        db = await open_db(db_path)
+        try:
+            async with db.transaction():
+                await db.set_current_param("a", 1.0)
+                await db.set_current_param("b", 2.0)
+            with pytest.raises(RuntimeError):
+                async with db.transaction():
+                    await db.set_current_param("c", 3.0)
+                    raise RuntimeError("boom")
+            assert await db.get_current_params() == {"a": 1.0, "b": 2.0}
+        finally:
+            await db.close()
+        fresh = await open_db(db_path)
+        try:
+            assert await fresh.get_current_params() == {"a": 1.0, "b": 2.0}
+        finally:
+            await fresh.close()
+
+    run(main())
+
+
+def test_nested_failure_rolls_back_only_the_inner_block(run, db_path):
+    async def main():
+        db = await open_db(db_path)
+        try:
+            async with db.transaction():
+                await db.set_current_param("outer", 1.0)
+                with pytest.raises(ValueError):
+                    async with db.transaction():
+                        await db.set_current_param("inner", 2.0)
+                        raise ValueError
+                await db.set_current_param("after", 3.0)
+            assert await db.get_current_params() == {"outer": 1.0, "after": 3.0}
+            assert not db.db.in_transaction
+        finally:
+            await db.close()
+
+    run(main())
+
+
+def test_concurrent_write_is_not_rolled_back_with_another_task(run, db_path):
+    async def main():
+        db = await open_db(db_path)
+        entered = asyncio.Event()
+
+        async def failing_task():
+            async with db.transaction():
+                await db.insert_api_cost({"service": "x", "cost_usd": 1.0, "purpose": "p", "created_at": "t"})
+                entered.set()
+                await asyncio.sleep(0.05)
+                raise RuntimeError("boom")
+
+        async def writer():
+            await entered.wait()
+            await db.set_current_param("x", 42.0)
+
+        try:
+            results = await asyncio.gather(failing_task(), writer(), return_exceptions=True)
+            assert isinstance(results[0], RuntimeError)
+            assert results[1] is None
+            assert await db.get_current_params() == {"x": 42.0}
+            assert await db.get_total_api_cost() == 0
+        finally:
+            await db.close()
+        fresh = await open_db(db_path)
+        try:
+            assert await fresh.get_current_params() == {"x": 42.0}
+        finally:
+            await fresh.close()
+
+    run(main())
+
+
+def test_failed_task_is_not_committed_by_another_tasks_exit(run, db_path):
+    async def main():
+        db = await open_db(db_path)
+        first_in = asyncio.Event()
+        release = asyncio.Event()
+
+        async def holder():
+            async with db.transaction():
+                await db.set_current_param("kept", 1.0)
+                first_in.set()
+                await release.wait()
+
+        async def failing():
+            await first_in.wait()
+            with pytest.raises(RuntimeError):
+                async with db.transaction():
+                    await db.set_current_param("dropped", 2.0)
+                    raise RuntimeError
+
+        async def releaser():
+            await first_in.wait()
+            await asyncio.sleep(0.01)
+            release.set()
+
+        try:
+            await asyncio.gather(holder(), failing(), releaser())
+            assert await db.get_current_params() == {"kept": 1.0}
+        finally:
+            await db.close()
+
+    run(main())
+
+
+def test_queued_trade_updates_apply_in_order_and_flush(run, db_path):
+    async def main():
+        db = await open_db(db_path)
+        try:
+            await db.insert_trade(trade_row("t00000001"))
+            await db.queue_trade_update("t00000001", {"market_regime": "trending"})
+            await db.queue_trade_update("t00000001", {"market_regime": "ranging", "pnl": 1.5})
+            await db.queue_trade_update("t00000001", {"market_regime": "volatile"})
+            assert await db.write_queued_trades(wait=False, limit=2) == 2
+            assert (await db.get_trade_by_id("t00000001"))["market_regime"] == "ranging"
+            assert await db.write_queued_trades(wait=False, limit=None) == 1
+            trade = await db.get_trade_by_id("t00000001")
+            assert (trade["market_regime"], trade["pnl"]) == ("volatile", 1.5)
+            assert await db.write_queued_trades(wait=False) == 0
+        finally:
+            await db.close()
+
+    run(main())
+
+
+def test_failed_trade_write_batch_is_retried_first(run, db_path):
+    async def main():
+        db = await open_db(db_path)
+        real_update = db.update_trades_many
+        calls = []
+
+        async def flaky(updates):
+            calls.append([fields for _, fields in updates])
+            if len(calls) == 1:
+                raise OSError("disk full")
+            await real_update(updates)
+
+        db.update_trades_many = flaky
+        try:
+            await db.insert_trade(trade_row("t00000001"))
+            await db.queue_trade_update("t00000001", {"pnl": 1.0})
+            with pytest.raises(OSError):
+                await db.write_queued_trades(wait=False)
+            await db.queue_trade_update("t00000001", {"pnl": 2.0})
+            # The retry doesn't block on the queue and keeps the failed batch in front
+            assert await asyncio.wait_for(db.write_queued_trades(), 1) == 2
+            assert calls[1] == [{"pnl": 1.0}, {"pnl": 2.0}]
+            assert (await db.get_trade_by_id("t00000001"))["pnl"] == 2.0
+        finally:
+            await db.close()
+
+    run(main())
+
+
+def test_trade_ids_continue_past_existing_rows(run, db_path):
+    async def main():
+        db = await open_db(db_path)
+        try:
+            await db.insert_trade(trade_row("t0000000a"))
+            await db.insert_trade(trade_row("deadbeef"))  # legacy uuid-derived id
+        finally:
+            await db.close()
+        db = await open_db(db_path)
+        try:
+            assert db.next_trade_id() == "t0000000b"
+        finally:
+            await db.close()
+
+    run(main())
+
+
+def test_trade_close_trigger_matches_rebuild(run, db_path):
+    day = "2026-01-01"
+
+    async def close(db, trade_id, pnl, hold):
+        await db.insert_trade({**trade_row(trade_id), "entry_fee": 0.1})
+        await db.update_trade(trade_id, {
+            "pnl": pnl, "exit_fee": 0.2, "hold_time_minutes": hold,
+            "closed_at": f"{day}T12:00:00", "status": "closed",
+        })
+
+    async def main():
+        db = await open_db(db_path)
+        try:
+            await close(db, "t00000001", 5.0, 10)
+            await close(db, "t00000002", -2.0, 20)
+            await db.insert_api_cost({"service": "claude", "cost_usd": 0.5, "purpose": "p",
+                                      "created_at": f"{day}T01:00:00"})
+            await db.snapshot_daily_stats(day, 1000, 1003, 0.5, 0.2, 1.0)
+            await close(db, "t00000003", 1.0, 30)  # after the snapshot: only the trigger sees it
+            [by_trigger] = await db.get_daily_stats()
+            assert by_trigger["total_trades"] == 3
+            assert by_trigger["winning_trades"] == 2 and by_trigger["losing_trades"] == 1
+            assert by_trigger["pnl_net"] == pytest.approx(5 - 2 + 1 - 0.5 - 0.2)
+            assert by_trigger["pnl_gross"] == pytest.approx(4 + 3 * 0.3)
+            assert (by_trigger["best_trade_pnl"], by_trigger["worst_trade_pnl"]) == (5.0, -2.0)
+            assert by_trigger["avg_hold_time_minutes"] == pytest.approx(20)
+
+            await db.rebuild_daily_trade_stats(day, other_costs=0.2)
+            [rebuilt] = await db.get_daily_stats()
+            assert rebuilt == pytest.approx(by_trigger)
+        finally:
+            await db.close()
+
+    run(main())
@@ -0,0 +1,67 @@
+import asyncio
+
+from conftest import open_db, trade_row
+from core.engine import TradingEngine
+
+
+def test_trade_writer_records_the_queue_then_exits_on_stop_sentinel(run):
+    async def main():
+        engine = TradingEngine()
+        recorded = []
+
+        async def record_trades(batch):
+            recorded.append(batch)
+
+        engine.memory.record_trades = record_trades
+        writer = asyncio.create_task(engine._trade_writer_loop())
+        for i in range(3):
+            engine._trade_write_q.put_nowait((f"trade{i}", {}, None))
+        engine._trade_write_q.put_nowait(None)
+        await asyncio.wait_for(writer, 1)
+        assert [t for batch in recorded for t, _, _ in batch] == ["trade0", "trade1", "trade2"]
+
+    run(main())
+
+
+def test_trade_writer_exits_on_an_empty_queue(run):
+    async def main():
+        engine = TradingEngine()
+        writer = asyncio.create_task(engine._trade_writer_loop())
+        await asyncio.sleep(0)
+        engine._trade_write_q.put_nowait(None)
+        await asyncio.wait_for(writer, 1)
+
+    run(main())
+
+
+def test_stop_cancels_the_db_writer_and_flushes_its_batch(run, db_path):
+    async def main():
+        engine = TradingEngine()
+        db = engine.db = await open_db(db_path)
+        await db.insert_trade(trade_row("t00000001"))
+        real_update = db.update_trades_many
+        writing = asyncio.Event()
+
+        async def slow_first_write(updates):
+            db.update_trades_many = real_update
+            async with db.transaction():
+                await real_update(updates)
+                writing.set()
+                await asyncio.sleep(10)  # still inside the write when stop() runs
+
+        db.update_trades_many = slow_first_write
+        engine._running = True
+        engine._db_writer_task = asyncio.create_task(engine._db_writer_loop())
+        await db.queue_trade_update("t00000001", {"market_regime": "trending"})
+        await asyncio.wait_for(writing.wait(), 1)
+        await db.queue_trade_update("t00000001", {"sentiment_score": 40})
+        await asyncio.wait_for(engine.stop(), 2)
+
+        fresh = await open_db(db_path)
+        try:
+            trade = await fresh.get_trade_by_id("t00000001")
+            assert (trade["market_regime"], trade["sentiment_score"]) == ("trending", 40)
+        finally:
+            await fresh.close()
+
+    run(main())
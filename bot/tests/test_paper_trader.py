@@ -0,0 +1,73 @@
+import pytest
+
+from conftest import open_db
+from core.models import ActionType, Direction, TradeDecision
+from execution.paper_trader import PaperTrader
+
+
+def assert_totals_match(trader: PaperTrader):
+    positions = trader.positions.values()
+    assert trader.total_margin_used == pytest.approx(sum(p.margin_used for p in positions))
+    assert trader.total_unrealized_pnl == pytest.approx(sum(p.unrealized_pnl for p in positions))
+    assert trader.total_equity == pytest.approx(
+        trader.balance + trader.total_margin_used + trader.total_unrealized_pnl
+    )
+
+
+def enter(pair: str, direction: Direction) -> TradeDecision:
+    action = ActionType.ENTER_LONG if direction is Direction.LONG else ActionType.ENTER_SHORT
+    return TradeDecision(action=action, pair=pair, direction=direction, leverage=5, position_size_pct=0.01)
+
+
+def test_running_totals_follow_open_mark_funding_and_close(run, db_path):
+    async def main():
+        db = await open_db(db_path)
+        try:
+            trader = PaperTrader(db, initial_balance=10_000)
+            btc = await trader.open_position(enter("BTCUSDT", Direction.LONG), 100.0)
+            eth = await trader.open_position(enter("ETHUSDT", Direction.SHORT), 50.0)
+            assert_totals_match(trader)
+            assert (await db.get_trade_by_id(btc.id))["status"] == "open"  # written before returning
+
+            trader.mark_price(btc, 110.0)
+            trader.update_position_price("ETHUSDT", 45.0)
+            assert btc.unrealized_pnl > 0 and eth.unrealized_pnl > 0
+            assert_totals_match(trader)
+
+            balance = trader.balance
+            cost = trader.apply_funding_batch({"BTCUSDT": 0.001, "ETHUSDT": 0.001, "XRPUSDT": 0.001})
+            assert cost == pytest.approx(btc.funding_paid + eth.funding_paid)
+            assert trader.balance == pytest.approx(balance - cost)
+            trader.mark_price(btc, 110.0)
+            trader.mark_price(eth, 45.0)
+            assert_totals_match(trader)
+
+            trade = await trader.close_position("BTCUSDT", 120.0, "tp")
+            assert trade.pnl > 0
+            assert list(trader.positions) == ["ETHUSDT"]
+            assert_totals_match(trader)
+
+            await trader.close_position("ETHUSDT", 40.0, "tp")
+            assert (trader.total_margin_used, trader.total_unrealized_pnl) == (0.0, 0.0)
+            assert trader.total_equity == trader.balance
+        finally:
+            await db.close()
+
+    run(main())
+
+
+def test_close_is_written_before_close_position_returns(run, db_path):
+    async def main():
+        db = await open_db(db_path)
+        try:
+            trader = PaperTrader(db, initial_balance=10_000)
+            position = await trader.open_position(enter("BTCUSDT", Direction.LONG), 100.0)
+            trade = await trader.close_position("BTCUSDT", 90.0, "sl")
+            row = await db.get_trade_by_id(position.id)
+            assert (row["status"], row["pnl"], row["exit_reasoning"]) == ("closed", trade.pnl, "sl")
+            assert (await db.get_daily_stats())[0]["total_trades"] == 1  # trg_trade_closed fired
+            assert await db.get_open_trades() == []
+        finally:
+            await db.close()
+
+    run(main())
@@ -0,0 +1,58 @@
+import asyncio
+
+from data.stream_manager import STREAM_BOOK_TICKER, STREAM_KLINE, StreamManager
+
+
+def kline_frame(ts: int, close: str, closed: bool) -> dict:
+    return {"stream": "btcusdt@kline_1m", "data": {"e": "kline", "s": "BTCUSDT", "k": {"t": ts, "c": close, "x": closed}}}
+
+
+def book_frame(bid: str) -> dict:
+    return {"stream": "btcusdt@bookTicker", "data": {"e": "bookTicker", "s": "BTCUSDT", "b": bid}}
+
+
+def dispatch(frames: list[dict]) -> list[tuple[int, dict]]:
+    """Queue `frames` as one burst and run the dispatcher until it has drained them."""
+    delivered: list[tuple[int, dict]] = []
+
+    async def main():
+        manager = StreamManager(["BTCUSDT"], lambda kind, payload: delivered.append((kind, payload)))
+        manager._build_streams()
+        manager._running = True
+        manager._inbox.extend(frames)
+        manager._inbox_ready.set()
+        task = asyncio.create_task(manager._dispatch_loop())
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        manager._running = False
+        task.cancel()
+
+    asyncio.run(main())
+    return delivered
+
+
+def test_burst_keeps_every_closed_kline_in_order():
+    frames = [
+        kline_frame(0, "1", False),
+        kline_frame(0, "2", True),
+        kline_frame(60, "3", False),
+        kline_frame(60, "4", False),
+        kline_frame(60, "5", True),
+        kline_frame(120, "6", False),
+    ]
+    delivered = dispatch(frames)
+    klines = [(p["k"]["t"], p["k"]["c"], p["k"]["x"]) for kind, p in delivered if kind == STREAM_KLINE]
+    assert klines == [(0, "2", True), (60, "5", True), (120, "6", False)]
+
+
+def test_burst_keeps_only_the_newest_open_update_per_stream():
+    frames = [book_frame("1"), kline_frame(0, "1", False), book_frame("2"), kline_frame(0, "2", False), book_frame("3")]
+    delivered = dispatch(frames)
+    assert [(kind, p.get("b") or p["k"]["c"]) for kind, p in delivered] == [
+        (STREAM_BOOK_TICKER, "3"), (STREAM_KLINE, "2"),
+    ]
+
+
+def test_single_frame_is_delivered_as_is():
+    frame = kline_frame(0, "1", True)
+    assert dispatch([frame]) == [(STREAM_KLINE, frame["data"])]